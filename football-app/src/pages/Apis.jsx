@@ -40,6 +40,7 @@ export default function Apis() {
           <h3 style={{ margin: "16px 0 10px" }}>Predictions & News</h3>
           <ul style={{ marginTop: 0 }}>
             <li>POST /predict</li>
+            <li>POST /predict/batch</li>
             <li>GET /news/latest</li>
           </ul>
 
@@ -0,0 +1,166 @@
+"""Password hashing in a dedicated, bounded process pool.
+
+bcrypt is deliberately slow (hundreds of ms of CPU per call). If it ran in
+request handlers, a burst of logins would fill the shared threadpool and
+stall every other endpoint. Instead:
+
+- Hashing and verifying run in their own process pool
+  (PASSWORD_HASH_WORKERS processes), so the CPU work is outside the API's
+  event loop and threadpool.
+- At most `workers` calls run at once. Up to PASSWORD_HASH_MAX_QUEUE more
+  wait their turn. Beyond that, callers get `PasswordHasherBusy` straight
+  away (mapped to 503 by the routes) instead of piling up.
+- The cost is set by BCRYPT_ROUNDS. A successful login whose stored hash
+  uses a different cost gets back a fresh hash, for the caller to save
+  (transparent rehash).
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Any
+
+from passlib.context import CryptContext
+
+logger = logging.getLogger("auth.hashing")
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+
+@lru_cache(maxsize=4)
+def crypt_context(rounds: int) -> CryptContext:
+    # min == max == default: any other cost is flagged as needing an update,
+    # whether it is lower (legacy) or higher (rounds were lowered).
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds,
+    )
+
+
+# Worker-side functions (must be importable top-level callables).
+
+def _hash(password: str, rounds: int) -> str:
+    return crypt_context(rounds).hash(password)
+
+
+def _verify_and_update(password: str, hashed: str, rounds: int) -> tuple[bool, str | None]:
+    try:
+        return crypt_context(rounds).verify_and_update(password, hashed)
+    except (ValueError, TypeError):
+        # Malformed / unknown stored hash: treat as a failed login.
+        return False, None
+
+
+class PasswordHasherBusy(Exception):
+    """The hashing queue is full."""
+
+
+class PasswordHasher:
+    def __init__(self, workers: int | None = None, max_queue: int | None = None, rounds: int = BCRYPT_ROUNDS):
+        self.workers = workers or int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+        self.rounds = rounds
+        self._executor: ProcessPoolExecutor | None = None
+        self._executor_lock = threading.Lock()
+        self._slots: asyncio.Semaphore | None = None
+        self.in_flight = 0
+        self.queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self._busy_seconds = 0.0
+        self._wait_seconds = 0.0
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    # spawn: forking a process that already runs threads
+                    # (model warm-up, watchers) is unsafe.
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                    )
+        return self._executor
+
+    def start(self) -> None:
+        """Start the worker processes ahead of the first login."""
+        pool = self._pool()
+        for _ in range(self.workers):
+            pool.submit(crypt_context, self.rounds)
+
+    def shutdown(self) -> None:
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    async def _run(self, fn, *args):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        if self.queued >= self.max_queue and self._slots.locked():
+            self.rejected += 1
+            raise PasswordHasherBusy()
+
+        self.queued += 1
+        waited = time.perf_counter()
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued -= 1
+        self._wait_seconds += time.perf_counter() - waited
+
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            pool = self._pool()
+            try:
+                return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+            except BrokenProcessPool:
+                # A worker died (e.g. OOM-killed); replace the pool once.
+                logger.warning("Password hashing pool broke; restarting it")
+                with self._executor_lock:
+                    if self._executor is pool:
+                        self._executor = None
+                return await asyncio.get_running_loop().run_in_executor(self._pool(), fn, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._busy_seconds += time.perf_counter() - started
+            self._slots.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash, password, self.rounds)
+
+    async def verify(self, password: str, hashed: str) -> tuple[bool, str | None]:
+        """(matches, new_hash); new_hash is set when the stored cost is outdated."""
+        ok, new_hash = await self._run(_verify_and_update, password, hashed or "", self.rounds)
+        if new_hash:
+            self.rehashed += 1
+        return ok, new_hash
+
+    def stats(self) -> dict[str, Any]:
+        done = self.completed or 1
+        return {
+            "workers": self.workers,
+            "rounds": self.rounds,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queued,
+            "max_queue": self.max_queue,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+            "avg_hash_ms": round(self._busy_seconds / done * 1000, 1),
+            "avg_wait_ms": round(self._wait_seconds / done * 1000, 1),
+        }
+
+
+password_hasher = PasswordHasher()
@@ -1,73 +1,108 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 
-from database.db import SessionLocal
+from database.db import get_async_db
 from database.models import User
 from auth.schemas import UserCreate, UserLogin, Token, ChangePasswordRequest
-from auth.security import hash_password, verify_password, create_access_token, get_current_user
+from auth.hashing import PasswordHasherBusy, password_hasher
+from auth.security import create_access_token, get_current_user, require_admin
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
-def get_db():
-    db = SessionLocal()
+# Handlers are async: bcrypt runs in the password hashing pool and the DB
+# through the async engine, so auth bursts don't occupy the threadpool.
+
+
+async def _hash(password: str) -> str:
     try:
-        yield db
-    finally:
-        db.close()
+        return await password_hasher.hash(password)
+    except PasswordHasherBusy:
+        raise HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": "1"})
+
+
+async def _verify(password: str, hashed: str) -> tuple[bool, str | None]:
+    try:
+        return await password_hasher.verify(password, hashed)
+    except PasswordHasherBusy:
+        raise HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": "1"})
+
+
+async def _get_user(db: AsyncSession, email: str) -> User | None:
+    return (await db.execute(select(User).where(User.email == email))).scalars().first()
+
 
 @router.post("/signup")
-def signup(user: UserCreate, db: Session = Depends(get_db)):
-    existing = db.query(User).filter(User.email == user.email).first()
+async def signup(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    existing = await _get_user(db, user.email)
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
 
     new_user = User(
         email=user.email,
-        hashed_password=hash_password(user.password)
+        hashed_password=await _hash(user.password)
     )
     db.add(new_user)
     try:
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail="Email already registered")
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
     return {"message": "User created successfully"}
 
 @router.post("/login", response_model=Token)
-def login(user: UserLogin, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.email == user.email).first()
+async def login(user: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    db_user = await _get_user(db, user.email)
+    if not db_user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    if not db_user or not verify_password(user.password, db_user.hashed_password):
+    ok, new_hash = await _verify(user.password, db_user.hashed_password)
+    if not ok:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    if new_hash:
+        # Stored with an outdated bcrypt cost: upgrade it now that we have
+        # the plaintext. A failed save only means we try again next login.
+        db_user.hashed_password = new_hash
+        try:
+            await db.commit()
+        except Exception:
+            await db.rollback()
+
     token = create_access_token({"sub": db_user.email})
     return {"access_token": token}
 
 
 @router.post("/change-password")
-def change_password(
+async def change_password(
     payload: ChangePasswordRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: str = Depends(get_current_user),
 ):
-    db_user = db.query(User).filter(User.email == current_user).first()
+    db_user = await _get_user(db, current_user)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    if not verify_password(payload.old_password, db_user.hashed_password):
+    ok, _ = await _verify(payload.old_password, db_user.hashed_password)
+    if not ok:
         raise HTTPException(status_code=400, detail="Old password is wrong")
 
-    db_user.hashed_password = hash_password(payload.new_password)
+    db_user.hashed_password = await _hash(payload.new_password)
     try:
-        db.commit()
+        await db.commit()
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
     return {"message": "Password updated"}
+
+
+@router.get("/hashing/stats")
+def hashing_stats(current_user: str = Depends(require_admin)):
+    """Password hashing pool: workers, queue depth, rejections, timings (admins only)."""
+    return password_hasher.stats()
@@ -1,18 +1,26 @@
 from passlib.context import CryptContext
 from datetime import datetime, timedelta, timezone
-from jose import jwt, JWTError
+from jose import jwt, JWTError, ExpiredSignatureError
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any
 
-# password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from auth.hashing import BCRYPT_ROUNDS, crypt_context
+
+# password hashing (sync helpers; the auth routes use the process pool in
+# auth/hashing.py)
+pwd_context: CryptContext = crypt_context(BCRYPT_ROUNDS)
 
 SECRET_KEY = "CHANGE_ME_LATER"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 26
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
 
 credentials_exception = HTTPException(
     status_code=status.HTTP_401_UNAUTHORIZED,
@@ -52,28 +60,117 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
 
 
 
-def get_current_user(token: str = Depends(oauth2_scheme)):
-    logger.debug("Verifying token (raw): %s", token)
+class _TokenCache:
+    """Bounded LRU of verified tokens -> (subject, valid-until).
+
+    Entries live at most `ttl` seconds and never past the token's own `exp`,
+    so a cached token expires exactly when a decoded one would. Keys are the
+    full token (header, payload and signature), so a reused signature with an
+    edited payload can never hit an entry.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+
+    def get(self, token: str, now: float):
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        if now >= entry[1]:
+            del self._entries[token]
+            return None
+        self._entries.move_to_end(token)
+        return entry
+
+    def put(self, token: str, value: Any, until: float) -> None:
+        self._entries[token] = (value, until)
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+class _RateLimitedLog:
+    """Logs at most one warning per `interval` per reason, with a count of
+    the ones suppressed in between."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._last: dict[str, float] = {}
+        self._suppressed: dict[str, int] = {}
+
+    def warning(self, reason: str, now: float) -> None:
+        if now - self._last.get(reason, float("-inf")) < self.interval:
+            self._suppressed[reason] = self._suppressed.get(reason, 0) + 1
+            return
+        suppressed = self._suppressed.pop(reason, 0)
+        self._last[reason] = now
+        if suppressed:
+            logger.warning("Token rejected: %s (%d similar suppressed)", reason, suppressed)
+        else:
+            logger.warning("Token rejected: %s", reason)
+
+
+_TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
+_valid_tokens = _TokenCache(_TOKEN_CACHE_SIZE, ttl=float(os.getenv("TOKEN_CACHE_TTL", "300")))
+# Recently rejected tokens: a client retrying an expired token is answered
+# without another HMAC + claims check.
+_rejected_tokens = _TokenCache(_TOKEN_CACHE_SIZE, ttl=60.0)
+_rejection_log = _RateLimitedLog(interval=60.0)
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    # Async and allocation-light: on a cache hit this is two dict lookups,
+    # with no threadpool hop and no signature check.
+    now = time.time()
+    cached = _valid_tokens.get(token, now)
+    if cached is not None:
+        return cached[0]
+    if _rejected_tokens.get(token, now) is not None:
+        raise credentials_exception
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        logger.debug("Token payload verified: %s", payload)
-        email: str = payload.get("sub")
-        if email is None:
-            logger.warning("Token missing 'sub' claim")
-            raise credentials_exception
-        return email
-    except JWTError as e:
-        # provide additional info for debugging expiry/clock issues
-        now_ts = int(datetime.now(timezone.utc).timestamp())
-        payload_no_verify = None
-        token_exp = None
-        try:
-            payload_no_verify = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], options={"verify_exp": False})
-            token_exp = payload_no_verify.get("exp")
-        except Exception:
-            payload_no_verify = None
-            token_exp = None
-
-        logger.warning("Token verification failed: %s", e)
-        logger.warning("Current UTC ts: %s, token exp: %s, token payload (no-verify): %s", now_ts, token_exp, payload_no_verify)
-        raise credentials_exception
+    except ExpiredSignatureError:
+        return _reject(token, "expired", now)
+    except JWTError:
+        return _reject(token, "invalid signature or claims", now)
+
+    email = payload.get("sub")
+    if email is None:
+        return _reject(token, "missing 'sub' claim", now)
+
+    exp = payload.get("exp")
+    until = now + _valid_tokens.ttl
+    if isinstance(exp, (int, float)):
+        until = min(until, float(exp))
+    _valid_tokens.put(token, email, until)
+    return email
+
+
+# Comma-separated emails allowed to call the /admin endpoints. Empty (the
+# default) means nobody is an admin.
+ADMIN_EMAILS = frozenset(
+    email.strip().lower() for email in os.getenv("ADMIN_EMAILS", "").split(",") if email.strip()
+)
+
+
+async def require_admin(current_user: str = Depends(get_current_user)):
+    if current_user.lower() not in ADMIN_EMAILS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return current_user
+
+
+async def get_optional_user(token: str | None = Depends(optional_oauth2_scheme)):
+    """The caller's email, or None without a token (a token sent must be valid)."""
+    if token is None:
+        return None
+    return await get_current_user(token)
+
+
+def _reject(token: str, reason: str, now: float):
+    _rejected_tokens.put(token, reason, now + _rejected_tokens.ttl)
+    # Never log the token or its claims.
+    _rejection_log.warning(reason, now)
+    raise credentials_exception
@@ -0,0 +1,203 @@
+"""Pluggable answer engines behind /chat and /chat/stream.
+
+An engine turns a message into an async stream of text chunks. Two ship:
+
+- `keyword` (default): the canned KB reply picked by the compiled matcher.
+- `retrieval`: BM25 over the KB replies plus club history/metrics rows from
+  the database, answering with the best-matching passages.
+
+Register more with `register_engine`. Engines run on the event loop and
+push blocking work (DB reads, index builds) to a worker thread in the background, so a
+streaming session never holds a threadpool worker while it is open.
+"""
+
+import abc
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import AsyncIterator, Callable
+
+from chat.kb import chat_kb
+from chat.retrieval import BM25Index, flatten_text
+
+logger = logging.getLogger("chat.engines")
+
+FALLBACK_REPLY = (
+    "I can help with football basics (formations, pressing, counters) or how to use this app (Team Selector, Build Team, Build Match). "
+    "Try asking: 'How do I predict a match?' or 'Which formation fits a counter-attacking team?'"
+)
+EMPTY_MESSAGE_REPLY = "Ask a question about football or how to use the app."
+
+
+def keyword_reply(message: str) -> str:
+    text = (message or "").strip().lower()
+    if not text:
+        return EMPTY_MESSAGE_REPLY
+
+    # Never blocks on a reload: a changed KB file is re-compiled in the
+    # background while this request uses the current snapshot.
+    snapshot = chat_kb.current()
+    kb = snapshot.data
+    # Most specific matching intent wins (see chat/matcher.py).
+    reply = snapshot.matcher.best_reply(text)
+    if reply:
+        return reply
+
+    default_reply = kb.get("default") if isinstance(kb, dict) else None
+    if isinstance(default_reply, str) and default_reply.strip():
+        return default_reply.strip()
+
+    return FALLBACK_REPLY
+
+
+async def stream_text(text: str) -> AsyncIterator[str]:
+    """Yield `text` word by word (whitespace kept), letting the loop flush."""
+    words = text.split(" ")
+    for i, word in enumerate(words):
+        yield word if i == len(words) - 1 else word + " "
+        await asyncio.sleep(0)
+
+
+class AnswerEngine(abc.ABC):
+    name = "base"
+
+    @abc.abstractmethod
+    def stream(self, message: str) -> AsyncIterator[str]:
+        """Yield the reply to `message` as text chunks."""
+
+
+class KeywordEngine(AnswerEngine):
+    name = "keyword"
+
+    async def stream(self, message: str) -> AsyncIterator[str]:
+        async for chunk in stream_text(keyword_reply(message)):
+            yield chunk
+
+
+def club_documents() -> list[dict[str, str]]:
+    """Club history and metrics rows as retrieval documents (blocking DB read)."""
+    from database.db import SessionLocal
+    from database.models import ClubHistory, ClubMetric
+
+    docs = []
+    db = SessionLocal()
+    try:
+        for team, history in db.query(ClubHistory.team, ClubHistory.history):
+            if history:
+                docs.append({"title": f"{team} club history", "text": flatten_text(history)})
+        for team, metrics in db.query(ClubMetric.team, ClubMetric.metrics):
+            if metrics:
+                docs.append({"title": f"{team} club metrics", "text": flatten_text(metrics)})
+    finally:
+        db.close()
+    return docs
+
+
+class RetrievalEngine(AnswerEngine):
+    """Answers from the passages that best match the question (BM25)."""
+
+    name = "retrieval"
+
+    def __init__(
+        self,
+        extra_documents: Callable[[], list[dict[str, str]]] | None = club_documents,
+        refresh_seconds: float = 600.0,
+        top_k: int = 3,
+        min_score: float = 0.5,
+    ):
+        self.extra_documents = extra_documents
+        self.refresh_seconds = refresh_seconds
+        self.top_k = top_k
+        self.min_score = min_score
+        self._extra: list[dict[str, str]] = []
+        self._extra_loaded_at = 0.0
+        self._extra_task: asyncio.Task | None = None
+        self._index: BM25Index | None = None
+        self._index_key = None
+        self._index_task: asyncio.Task | None = None
+
+    def _refresh_extra(self) -> None:
+        """Reload DB documents on a worker thread; requests keep the old set."""
+        if self.extra_documents is None or (self._extra_task is not None and not self._extra_task.done()):
+            return
+        if self._extra_loaded_at and time.monotonic() - self._extra_loaded_at < self.refresh_seconds:
+            return
+
+        async def _load():
+            try:
+                self._extra = await asyncio.to_thread(self.extra_documents)
+            except Exception as e:
+                logger.warning("Retrieval engine could not load DB documents: %s", e)
+            self._extra_loaded_at = time.monotonic()
+
+        self._extra_task = asyncio.ensure_future(_load())
+
+    async def _build_index(self, snapshot, key) -> None:
+        docs = [
+            {"title": " ".join(snapshot.matcher.keywords[k] for k in ids), "text": reply}
+            for _, ids, reply in snapshot.matcher.intents
+        ]
+        try:
+            self._index = await asyncio.to_thread(BM25Index, docs + list(self._extra))
+            self._index_key = key
+        except Exception as e:
+            logger.warning("Retrieval engine could not build its index: %s", e)
+
+    async def _current_index(self) -> BM25Index | None:
+        """The current index. A changed KB or document set is re-indexed on a
+        worker thread and swapped in; until then requests use the old index.
+        Only the very first build is waited for."""
+        self._refresh_extra()
+        snapshot = chat_kb.current()
+        key = (snapshot.signature, self._extra_loaded_at)
+        if key != self._index_key and (self._index_task is None or self._index_task.done()):
+            self._index_task = asyncio.ensure_future(self._build_index(snapshot, key))
+        if self._index is None:
+            # Shielded: a client going away must not cancel the shared build.
+            await asyncio.shield(self._index_task)
+        return self._index
+
+    async def stream(self, message: str) -> AsyncIterator[str]:
+        index = await self._current_index()
+        hits = [] if index is None else index.search(message, k=self.top_k)
+        hits = [(s, d) for s, d in hits if s >= self.min_score]
+        if not hits:
+            async for chunk in stream_text(keyword_reply(message)):
+                yield chunk
+            return
+
+        # The best passage starts streaming right away; the rest follow.
+        for i, (_, doc) in enumerate(hits):
+            if i:
+                yield "\n\n"
+            async for chunk in stream_text(doc["text"]):
+                yield chunk
+
+
+_ENGINES: dict[str, AnswerEngine] = {}
+
+
+def register_engine(engine: AnswerEngine) -> None:
+    _ENGINES[engine.name] = engine
+
+
+def get_engine(name: str | None = None) -> AnswerEngine | None:
+    return _ENGINES.get(name or os.getenv("CHAT_ENGINE", KeywordEngine.name))
+
+
+register_engine(KeywordEngine())
+register_engine(RetrievalEngine())
+
+
+async def sse_events(engine: AnswerEngine, message: str) -> AsyncIterator[str]:
+    """Server-Sent Events framing for an engine's stream."""
+    try:
+        async for chunk in engine.stream(message):
+            yield f"data: {json.dumps({'token': chunk})}\n\n"
+    except Exception as e:
+        logger.warning("Chat engine %s failed: %s", engine.name, e)
+        yield f"event: error\ndata: {json.dumps({'detail': 'chat engine failed'})}\n\n"
+        return
+    yield f"event: done\ndata: {json.dumps({'engine': engine.name})}\n\n"
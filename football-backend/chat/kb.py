@@ -0,0 +1,112 @@
+"""Chat knowledge base loading with change detection.
+
+The JSON file is re-read only when its `os.stat` mtime/size (or the
+configured path) changes. A change starts a single background reload that
+parses and compiles the KB; until it finishes, requests keep using the
+previous snapshot, so no request ever waits on a reload. Only the very first
+load (done at startup) is synchronous.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any
+
+from chat.matcher import IntentMatcher
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_KB_PATH = os.path.join(BASE_DIR, "chat_knowledge.json")
+
+
+def kb_path() -> str:
+    return os.getenv("CHAT_KB_PATH") or DEFAULT_KB_PATH
+
+
+def _signature(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return (path, None, None)
+    return (path, st.st_mtime_ns, st.st_size)
+
+
+class KBSnapshot:
+    """One parsed and compiled version of the knowledge base."""
+
+    __slots__ = ("data", "matcher", "signature", "loaded_at")
+
+    def __init__(self, data: dict[str, Any], signature):
+        self.data = data
+        self.matcher = IntentMatcher(data.get("intents"))
+        self.signature = signature
+        self.loaded_at = time.time()
+
+
+def _read_kb(path: str) -> dict[str, Any]:
+    """Parse the KB file.
+
+    Format:
+      {
+        "default": "...",
+        "intents": [
+          {"any": ["kw1", "kw2"], "reply": "..."},
+          {"all": ["kw1", "kw2"], "reply": "..."}
+        ]
+      }
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError("chat KB must be a JSON object")
+        if "intents" in data and not isinstance(data.get("intents"), list):
+            raise ValueError("chat KB intents must be a list")
+    except Exception:
+        data = {}
+    return data
+
+
+class ChatKnowledgeBase:
+    def __init__(self, check_interval: float = 1.0):
+        # Stat at most once per interval; os.stat is cheap but not free.
+        self.check_interval = check_interval
+        self._snapshot: KBSnapshot | None = None
+        self._lock = threading.Lock()
+        self._reloading = False
+        self._checked_at = 0.0
+
+    def _load(self, signature) -> KBSnapshot:
+        return KBSnapshot(_read_kb(signature[0]), signature)
+
+    def _reload(self, signature) -> None:
+        try:
+            self._snapshot = self._load(signature)
+        finally:
+            with self._lock:
+                self._reloading = False
+
+    def current(self) -> KBSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = self._load(_signature(kb_path()))
+                return self._snapshot
+
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return snapshot
+        self._checked_at = now
+
+        signature = _signature(kb_path())
+        if signature != snapshot.signature:
+            with self._lock:
+                if self._reloading:
+                    return snapshot
+                self._reloading = True
+            threading.Thread(target=self._reload, args=(signature,), name="chat-kb-reload", daemon=True).start()
+        return snapshot
+
+
+chat_kb = ChatKnowledgeBase()
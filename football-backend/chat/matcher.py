@@ -0,0 +1,140 @@
+"""Compiled keyword matcher for the chat knowledge base.
+
+The KB is compiled once per reload into an Aho–Corasick automaton over
+every (lower-cased) keyword, so one pass over a message finds every keyword
+it contains, whatever the number of intents. An inverted index from keyword
+to intents then resolves the `any` / `all` rules:
+
+- `any`: at least one keyword occurs in the message (substring match);
+- `all`: every keyword occurs (used only when `any` is absent or empty).
+
+All matching intents are ranked by specificity: an `all` intent scores the
+total length of its keywords, an `any` intent the length of its longest
+matched keyword. Ties keep the file order.
+"""
+
+from collections import deque
+from typing import Any
+
+
+class AhoCorasick:
+    """Multi-pattern substring search; reports the set of pattern ids found."""
+
+    def __init__(self, patterns: list[str]):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[list[int]] = [[]]
+
+        for pid, pattern in enumerate(patterns):
+            if not pattern:
+                continue
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(pid)
+
+        # Breadth-first failure links; each state's outputs absorb those of
+        # its failure state so matching never has to walk the chain.
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                if state:
+                    f = self._fail[state]
+                    while f and ch not in self._goto[f]:
+                        f = self._fail[f]
+                    self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find(self, text: str) -> set[int]:
+        goto, fail, out = self._goto, self._fail, self._out
+        found: set[int] = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+
+class IntentMatcher:
+    """KB intents compiled for single-pass matching."""
+
+    def __init__(self, intents: Any):
+        self.keywords: list[str] = []
+        keyword_ids: dict[str, int] = {}
+        # Per intent: (mode, keyword ids, reply); replies are pre-stripped.
+        self.intents: list[tuple[str, list[int], str]] = []
+        self._by_keyword: dict[int, list[int]] = {}
+        # Empty keywords are a substring of every message.
+        self._always: list[int] = []
+
+        for intent in intents if isinstance(intents, list) else []:
+            if not isinstance(intent, dict):
+                continue
+
+            reply = intent.get("reply")
+            if not isinstance(reply, str) or not reply.strip():
+                continue
+
+            any_keywords = intent.get("any")
+            all_keywords = intent.get("all")
+            if isinstance(any_keywords, list) and any_keywords:
+                mode, words = "any", any_keywords
+            elif isinstance(all_keywords, list) and all_keywords:
+                mode, words = "all", all_keywords
+            else:
+                continue
+
+            ids = []
+            for word in dict.fromkeys(str(k).lower() for k in words):
+                kid = keyword_ids.get(word)
+                if kid is None:
+                    kid = keyword_ids[word] = len(self.keywords)
+                    self.keywords.append(word)
+                ids.append(kid)
+
+            index = len(self.intents)
+            self.intents.append((mode, ids, reply.strip()))
+            for kid in ids:
+                self._by_keyword.setdefault(kid, []).append(index)
+
+        self._always = [kid for kid, word in enumerate(self.keywords) if not word]
+        self._automaton = AhoCorasick(self.keywords)
+
+    def match(self, text: str) -> list[tuple[int, int]]:
+        """All matching intents as (intent index, specificity), best first."""
+        found = self._automaton.find(text)
+        found.update(self._always)
+
+        candidates: set[int] = set()
+        for kid in found:
+            candidates.update(self._by_keyword.get(kid, ()))
+
+        ranked = []
+        for index in candidates:
+            mode, ids, _ = self.intents[index]
+            if mode == "any":
+                ranked.append((index, max(len(self.keywords[k]) for k in ids if k in found)))
+            elif all(k in found for k in ids):
+                ranked.append((index, sum(len(self.keywords[k]) for k in ids)))
+
+        ranked.sort(key=lambda item: (-item[1], item[0]))
+        return ranked
+
+    def replies(self, text: str) -> list[str]:
+        return [self.intents[index][2] for index, _ in self.match(text)]
+
+    def best_reply(self, text: str) -> str | None:
+        ranked = self.match(text)
+        return self.intents[ranked[0][0]][2] if ranked else None
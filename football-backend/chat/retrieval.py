@@ -0,0 +1,68 @@
+"""Small in-memory BM25 index for the local retrieval chat engine."""
+
+import math
+import re
+from collections import Counter
+from typing import Any
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+# Very common words carry no signal for ranking.
+_STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from how i in is it me my of on or our "
+    "so that the their this to was we what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if t not in _STOPWORDS]
+
+
+def flatten_text(value: Any) -> str:
+    """Readable text from a JSON blob (club history / metrics rows)."""
+    if isinstance(value, dict):
+        return ". ".join(f"{k}: {flatten_text(v)}" for k, v in value.items() if v not in (None, "", [], {}))
+    if isinstance(value, (list, tuple)):
+        return "; ".join(flatten_text(v) for v in value if v not in (None, "", [], {}))
+    return str(value)
+
+
+class BM25Index:
+    """Okapi BM25 over (title, text) documents with an inverted index.
+
+    Scoring touches only the postings of the query terms, so cost follows
+    the query, not the corpus size.
+    """
+
+    def __init__(self, documents: list[dict[str, str]], k1: float = 1.5, b: float = 0.75):
+        self.documents = documents
+        self.k1 = k1
+        self.b = b
+        self._postings: dict[str, list[tuple[int, int]]] = {}
+        self._lengths: list[int] = []
+
+        for doc_id, doc in enumerate(documents):
+            terms = Counter(tokenize(f"{doc.get('title', '')} {doc.get('text', '')}"))
+            self._lengths.append(sum(terms.values()))
+            for term, tf in terms.items():
+                self._postings.setdefault(term, []).append((doc_id, tf))
+
+        n = len(documents)
+        self._avg_length = (sum(self._lengths) / n) if n else 0.0
+        self._idf = {
+            term: math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+
+    def search(self, query: str, k: int = 3) -> list[tuple[float, dict[str, str]]]:
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, tf in self._postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / (self._avg_length or 1))
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        best = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+        return [(score, self.documents[doc_id]) for doc_id, score in best]
@@ -0,0 +1 @@
+# Makes the backend packages (services, logic, ...) importable from tests/.
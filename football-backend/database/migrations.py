@@ -0,0 +1,116 @@
+"""Versioned schema migrations.
+
+`Base.metadata.create_all` creates missing tables, but it never changes
+tables that already exist. Changes to existing tables (new columns, new
+indexes) go here as numbered steps. Each step runs once, and the versions
+that have been applied are recorded in `schema_migrations`.
+
+Run at app startup, or by hand:
+
+    python -m database.migrations            # apply pending steps
+    python -m database.migrations --status   # list applied / pending
+"""
+
+import argparse
+from typing import Callable
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.sql import func
+
+from database.models import Analysis, Base, Player, ReferenceDataVersion
+
+_meta = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    _meta,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+)
+
+# Arbitrary constant for the Postgres advisory lock held while migrating.
+_ADVISORY_LOCK_ID = 0x0F007BA11
+
+
+def _add_analysis_name(conn: Connection) -> None:
+    columns = {c["name"] for c in inspect(conn).get_columns("analyses")}
+    if "name" not in columns:
+        conn.execute(text("ALTER TABLE analyses ADD COLUMN name VARCHAR"))
+
+
+def _add_lookup_indexes(conn: Connection) -> None:
+    for index in (*Analysis.__table__.indexes, *Player.__table__.indexes):
+        if index.name in {
+            "ix_analyses_user_email_created_at",
+            "ix_analyses_user_email_name",
+            "ix_players_team_covering",
+        }:
+            index.create(conn, checkfirst=True)
+    # Superseded by the covering index above.
+    conn.execute(text("DROP INDEX IF EXISTS ix_players_team"))
+
+
+def _seed_reference_version(conn: Connection) -> None:
+    table = ReferenceDataVersion.__table__
+    if conn.execute(select(table.c.id).where(table.c.id == 1)).first() is None:
+        conn.execute(table.insert().values(id=1, version=0))
+
+
+# (version, description, step). Append only; never renumber or edit a
+# released step.
+MIGRATIONS: list[tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "analyses.name column", _add_analysis_name),
+    (2, "composite indexes for per-user analyses and squad lookups", _add_lookup_indexes),
+    (3, "reference data version counter", _seed_reference_version),
+]
+
+
+def applied_versions(conn: Connection) -> set[int]:
+    schema_migrations.create(conn, checkfirst=True)
+    return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+
+def migrate(engine: Engine) -> list[int]:
+    """Create missing tables, then apply pending steps in one transaction.
+
+    Returns the versions applied by this call.
+    """
+    applied_now = []
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            # Several workers may start at once; only one migrates.
+            conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": _ADVISORY_LOCK_ID})
+
+        Base.metadata.create_all(bind=conn)
+        done = applied_versions(conn)
+        for version, description, step in MIGRATIONS:
+            if version in done:
+                continue
+            step(conn)
+            conn.execute(schema_migrations.insert().values(version=version, description=description))
+            applied_now.append(version)
+    return applied_now
+
+
+def main() -> None:
+    from database.db import engine
+
+    parser = argparse.ArgumentParser(description="Apply database schema migrations.")
+    parser.add_argument("--status", action="store_true", help="List applied and pending migrations")
+    args = parser.parse_args()
+
+    if args.status:
+        with engine.begin() as conn:
+            done = applied_versions(conn)
+        for version, description, _ in MIGRATIONS:
+            print(f"{version:>4}  {'applied' if version in done else 'pending':<8} {description}")
+        return
+
+    applied = migrate(engine)
+    print(f"Applied migrations: {applied}" if applied else "Schema is up to date.")
+
+
+if __name__ == "__main__":
+    main()
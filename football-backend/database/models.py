@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, JSON, DateTime, UniqueConstraint
+from sqlalchemy import Column, Integer, String, JSON, DateTime, Index, UniqueConstraint
 from sqlalchemy.sql import func
 from .db import Base
 
@@ -13,9 +13,19 @@ class Team(Base):
 class Player(Base):
     __tablename__ = "players"
 
+    __table_args__ = (
+        # Squad lookups read only these columns; on Postgres the INCLUDE
+        # columns make /players/{team} an index-only scan.
+        Index(
+            "ix_players_team_covering",
+            "team",
+            postgresql_include=["name", "position", "rating"],
+        ),
+    )
+
     id = Column(Integer, primary_key=True)
     name = Column(String, index=True)
-    team = Column(String, index=True)
+    team = Column(String)
     position = Column(String)
     rating = Column(Integer)
 
@@ -47,6 +57,12 @@ class User(Base):
 class Analysis(Base):
     __tablename__ = "analyses"
 
+    __table_args__ = (
+        # Per-user list (newest first) and lookup by name.
+        Index("ix_analyses_user_email_created_at", "user_email", "created_at"),
+        Index("ix_analyses_user_email_name", "user_email", "name"),
+    )
+
     id = Column(Integer, primary_key=True)
     user_email = Column(String, index=True)
 
@@ -80,3 +96,13 @@ class CustomTeam(Base):
 
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
+
+
+class ReferenceDataVersion(Base):
+    """Single-row counter bumped whenever reference data (teams, players,
+    club metrics/history) changes; in-process caches reload when it moves."""
+
+    __tablename__ = "reference_data_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,220 @@
+"""In-process cache of the reference tables (teams, players, club metrics and
+history).
+
+The tables change only when they are seeded or edited by an admin, so each
+process keeps one immutable snapshot of them. The snapshot is loaded at
+startup and replaced as a whole:
+
+- Writers call `bump_reference_version` in the same transaction as their
+  change. This increments the single-row `reference_data_version` counter.
+- Readers never wait on the DB. At most once per `check_interval`, a read
+  starts a background task that compares the counter with the snapshot's
+  version and reloads when they differ. Until the reload finishes, the old
+  snapshot keeps serving.
+
+A custom team can use the same name as an official team, and it shadows
+that team for its owner. The snapshot therefore also records the
+(owner, name) pairs where that happens. Official reads can then be answered
+from memory without first checking for a custom team. A write has to be
+visible right away, though:
+
+- The creating process adds the new pair to its live snapshot
+  (`mark_shadowed`).
+- Until a snapshot loaded after the newest known write is in place, reads of
+  official names go to the DB (`current_for`). Writes are known from this
+  process's own `mark_shadowed` calls and from version checks that found the
+  counter moved, so other workers lag by at most one `check_interval`.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from database.models import ClubHistory, ClubMetric, CustomTeam, Player, ReferenceDataVersion, Team
+
+logger = logging.getLogger("database.reference_cache")
+
+
+def bump_reference_version(db: Session) -> None:
+    """Mark reference data as changed (commits with the caller's transaction)."""
+    db.execute(
+        update(ReferenceDataVersion)
+        .where(ReferenceDataVersion.id == 1)
+        .values(version=ReferenceDataVersion.version + 1)
+    )
+
+
+class ReferenceSnapshot:
+    __slots__ = ("version", "teams", "logos", "players", "metrics", "history", "shadowed", "loaded_at")
+
+    def __init__(self, version: int):
+        self.version = version
+        self.teams: list[str] = []
+        self.logos: dict[str, Any] = {}
+        self.players: dict[str, list[dict[str, Any]]] = {}
+        self.metrics: dict[str, Any] = {}
+        self.history: dict[str, Any] = {}
+        self.shadowed: set[tuple[str, str]] = set()
+        self.loaded_at = time.time()
+
+    def is_official(self, team_name: str, owner_email: str) -> bool:
+        return team_name in self.logos and (owner_email, team_name) not in self.shadowed
+
+
+async def _read_version(db) -> int:
+    version = (
+        await db.execute(select(ReferenceDataVersion.version).where(ReferenceDataVersion.id == 1))
+    ).scalar_one_or_none()
+    return version or 0
+
+
+async def _load_snapshot() -> ReferenceSnapshot:
+    from database.db import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        snap = ReferenceSnapshot(await _read_version(db))
+
+        for name, logo in await db.execute(select(Team.name, Team.logo).order_by(Team.id)):
+            snap.logos.setdefault(name, logo)
+        snap.teams = sorted(snap.logos, key=lambda s: str(s).lower())
+
+        for p in await db.execute(
+            select(Player.team, Player.name, Player.position, Player.rating).order_by(Player.id)
+        ):
+            snap.players.setdefault(p.team, []).append(
+                {"name": p.name, "position": p.position, "rating": p.rating}
+            )
+
+        # First row per team wins, as with the per-request `.first()` lookups.
+        for team, metrics in await db.execute(select(ClubMetric.team, ClubMetric.metrics).order_by(ClubMetric.id)):
+            snap.metrics.setdefault(team, metrics)
+        for team, history in await db.execute(select(ClubHistory.team, ClubHistory.history).order_by(ClubHistory.id)):
+            snap.history.setdefault(team, history)
+
+        if snap.logos:
+            snap.shadowed = set(
+                (
+                    await db.execute(
+                        select(CustomTeam.owner_email, CustomTeam.name).where(CustomTeam.name.in_(list(snap.logos)))
+                    )
+                ).tuples()
+            )
+    return snap
+
+
+class ReferenceCache:
+    def __init__(self, check_interval: float = 5.0):
+        self.check_interval = check_interval
+        self._snapshot: ReferenceSnapshot | None = None
+        self._task: asyncio.Task | None = None
+        self._checked_at = 0.0
+        self._reload_again = False
+        self._invalidated = False
+        # Wall time of the newest write the current snapshot may be missing.
+        self._written_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    async def refresh(self, force: bool = False) -> ReferenceSnapshot | None:
+        """Reload if the DB version moved (or unconditionally with `force`)."""
+        snapshot = self._snapshot
+        if snapshot is not None and not force:
+            from database.db import AsyncSessionLocal
+
+            async with AsyncSessionLocal() as db:
+                if await _read_version(db) == snapshot.version:
+                    return snapshot
+            self._written_at = time.time()
+
+        started = time.perf_counter()
+        self._snapshot = await _load_snapshot()
+        logger.info(
+            "Reference data v%s loaded in %.0f ms (%d teams)",
+            self._snapshot.version,
+            (time.perf_counter() - started) * 1000,
+            len(self._snapshot.teams),
+        )
+        return self._snapshot
+
+    def _refresh_in_background(self, force: bool = False) -> None:
+        if self._task is not None and not self._task.done():
+            # A running check may have read the version before the write
+            # committed; reload once more when it finishes.
+            self._reload_again = self._reload_again or force
+            return
+
+        async def _run():
+            reload = force
+            while True:
+                self._reload_again = False
+                try:
+                    await self.refresh(force=reload)
+                except Exception as e:
+                    logger.warning("Reference data refresh failed: %s", e)
+                if not self._reload_again:
+                    break
+                reload = True
+
+        self._task = asyncio.ensure_future(_run())
+
+    def current(self) -> ReferenceSnapshot | None:
+        """The loaded snapshot (None until the first load succeeds)."""
+        now = time.monotonic()
+        if self._invalidated or now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            force, self._invalidated = self._invalidated, False
+            self._refresh_in_background(force=force)
+
+        snapshot = self._snapshot
+        if snapshot is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return snapshot
+
+    def current_for(self, team_name: str) -> ReferenceSnapshot | None:
+        """`current()`, or None when `team_name` is official and the snapshot
+        predates a write (a custom team may now shadow it); the caller then
+        reads from the DB."""
+        snapshot = self.current()
+        if snapshot is not None and team_name in snapshot.logos and snapshot.loaded_at < self._written_at:
+            return None
+        return snapshot
+
+    def mark_shadowed(self, owner_email: str, team_name: str) -> None:
+        """Record a committed custom team that shadows an official one.
+
+        The live snapshot sees it immediately; a reload picks it up from the
+        DB. Safe to call from the threadpool, like `invalidate`.
+        """
+        self._written_at = time.time()
+        snapshot = self._snapshot
+        if snapshot is not None:
+            snapshot.shadowed.add((owner_email, team_name))
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        """Reload on the next read (for writes made by this process).
+
+        Only sets a flag, so it is safe to call from sync endpoints running
+        in the threadpool; the reload itself starts on the event loop.
+        """
+        self._invalidated = True
+
+    def stats(self) -> dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "loaded": snapshot is not None,
+            "version": snapshot.version if snapshot else None,
+            "loaded_at": snapshot.loaded_at if snapshot else None,
+            "teams": len(snapshot.teams) if snapshot else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+reference_cache = ReferenceCache()
@@ -1,19 +1,406 @@
-"""Database seeding helper.
+"""Bulk import of reference data: teams, players, club metrics and club history.
 
-This project previously seeded initial teams/players/metrics from JSON files in
-`football-backend/data`. Those files have been removed.
+Run from football-backend/:
 
-If you still need seeding, reintroduce a supported data source (e.g. SQL
-migrations, admin upload, or a new seed dataset) and implement it here.
+    python -m database.seed                          # bundled formation data (see below)
+    python -m database.seed --players players.csv --history history.json
+    python -m database.seed --players players.csv --lineups   # plus the bundled lineup files
+
+Sources are read as streams (CSV, JSON array/object or JSON lines):
+
+- `--teams`: name, logo
+- `--players`: team, name, position, rating
+- `--metrics`: team plus a `metrics` list, or CSV rows of team, metric, value
+- `--history`: team plus a `history` list, or CSV rows of team, category,
+  honour, total_wins
+- `--lineups`: the player-strength presence CSVs (default directory:
+  logic/player_strength/data) (one file per team; every
+  column except `Result` is a player, named exactly as the model knows them).
+  Only adds players that do not exist yet, with the default rating. The CSVs
+  carry no positions, so import them only together with `--players`;
+  otherwise the UI shows these players without a position group.
+- `--formations`: formation_strength.csv. Imports the teams, and
+  per-formation win/draw/loss rates as club metrics for teams that have none.
+
+Without arguments, the bundled formation_strength.csv is imported.
+
+The whole import runs in one transaction. Rows are staged in temporary
+tables (via `COPY` on Postgres/psycopg2, batched `executemany` elsewhere) and
+then merged into the real tables, keyed on their natural keys (team name;
+team + player name; team for metrics/history). Existing rows are updated,
+and only non-null staged values overwrite. Data derived from the model files
+(their teams, lineup players, formation metrics) is insert-only and merged
+after the explicit sources, so it never replaces curated or explicitly
+imported rows. The model files name the same teams, so only keys repeated
+within the explicit sources are reported as duplicates.
+The reference data version is bumped in the same transaction, so running
+APIs reload their caches.
+
+Prints one JSON report with row counts and rows/second per table.
 """
 
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import sys
+import time
+from typing import Any, Iterable, Iterator
+
+from sqlalchemy import JSON, Column, MetaData, Table, text
+from sqlalchemy.engine import Connection
+
+from database.models import ClubHistory, ClubMetric, Player, Team
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_LINEUPS_DIR = os.path.join(BASE_DIR, "logic", "player_strength", "data")
+DEFAULT_FORMATIONS_CSV = os.path.join(BASE_DIR, "logic", "formation_strength", "data", "formation_strength.csv")
+
+# target -> (table, natural key columns, value columns, update existing rows)
+# Merged in this order; insert-only targets follow the explicit ones.
+TARGETS = {
+    "teams": (Team.__table__, ("name",), ("logo",), True),
+    "model_teams": (Team.__table__, ("name",), ("logo",), False),
+    "players": (Player.__table__, ("team", "name"), ("position", "rating"), True),
+    "lineup_players": (Player.__table__, ("team", "name"), ("position", "rating"), False),
+    "club_metrics": (ClubMetric.__table__, ("team",), ("metrics",), True),
+    "formation_metrics": (ClubMetric.__table__, ("team",), ("metrics",), False),
+    "club_history": (ClubHistory.__table__, ("team",), ("history",), True),
+}
+
+# Rating given to players added from lineup files (as for custom-team players
+# created without one).
+DEFAULT_PLAYER_RATING = 70
+
+BATCH_SIZE = 5000
+
+
+# ----------------------------
+# Source readers
+# ----------------------------
+
+def read_records(path: str) -> Iterator[dict[str, Any]]:
+    """Stream dict rows from a .csv, .json (array or object) or .jsonl file."""
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if ext == ".csv":
+            yield from csv.DictReader(f)
+        elif ext in (".jsonl", ".ndjson"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            data = json.load(f)
+            if isinstance(data, dict):
+                # {"Arsenal": [...], ...} keyed by team
+                for team, value in data.items():
+                    yield {"team": team, "value": value}
+            else:
+                yield from data
+
+
+def _blank_to_none(value):
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+
+def _int_or_none(value):
+    value = _blank_to_none(value)
+    return None if value is None else int(float(value))
+
+
+def team_rows(path: str) -> Iterator[dict[str, Any]]:
+    for r in read_records(path):
+        yield {"name": _blank_to_none(r.get("name") or r.get("team")), "logo": _blank_to_none(r.get("logo"))}
+
+
+def player_rows(path: str) -> Iterator[dict[str, Any]]:
+    for r in read_records(path):
+        yield {
+            "team": _blank_to_none(r.get("team")),
+            "name": _blank_to_none(r.get("name")),
+            "position": _blank_to_none(r.get("position")),
+            "rating": _int_or_none(r.get("rating")),
+        }
+
+
+def _grouped_blobs(path: str, blob_key: str, item_fields: tuple[str, ...]) -> Iterator[dict[str, Any]]:
+    """One {team, blob_key: [...]} row per team.
+
+    JSON sources carry the list per team already. CSV rows (one item each)
+    are grouped by team, keeping the file order.
+    """
+    grouped: dict[str, list] = {}
+    for r in read_records(path):
+        team = _blank_to_none(r.get("team"))
+        if team is None:
+            continue
+        value = r.get(blob_key, r.get("value"))
+        if isinstance(value, (list, dict)):
+            yield {"team": team, blob_key: value}
+        else:
+            grouped.setdefault(team, []).append({f: _blank_to_none(r.get(f)) for f in item_fields})
+    for team, items in grouped.items():
+        yield {"team": team, blob_key: items}
+
+
+def metric_rows(path: str) -> Iterator[dict[str, Any]]:
+    return _grouped_blobs(path, "metrics", ("metric", "value"))
+
+
+def history_rows(path: str) -> Iterator[dict[str, Any]]:
+    # /club-history looks teams up lower-cased.
+    for row in _grouped_blobs(path, "history", ("category", "honour", "total_wins")):
+        yield {"team": row["team"].lower(), "history": row["history"]}
+
+
+def _team_key(name: str) -> str:
+    return "".join(ch for ch in name.lower() if ch.isalnum())
 
-def main() -> None:
-    print(
-        "No seed data present (JSON seed dataset removed). "
-        "Nothing to seed."
+
+def _display_name(stem: str, known: dict[str, str]) -> str:
+    """`bayernMunich` -> `Bayern Munich` (or the matching known team name)."""
+    match = known.get(_team_key(stem))
+    if match:
+        return match
+    return " ".join(w[:1].upper() + w[1:] for w in re.sub(r"([a-z])([A-Z])", r"\1 \2", stem).replace("_", " ").split())
+
+
+def lineup_paths(path: str) -> list[str]:
+    if os.path.isdir(path):
+        return sorted(os.path.join(path, f) for f in os.listdir(path) if f.endswith(".csv"))
+    return [path]
+
+
+def lineup_rows(paths: Iterable[str], known_teams: dict[str, str]) -> Iterator[tuple[str, dict[str, Any]]]:
+    """(target, row) pairs: the team and every player column of each file."""
+    for path in paths:
+        team = _display_name(os.path.splitext(os.path.basename(path))[0], known_teams)
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            header = next(csv.reader(f), [])
+        yield "model_teams", {"name": team, "logo": None}
+        for col in header:
+            if col.strip() and col.strip().lower() not in ("result", "team"):
+                yield "lineup_players", {
+                    "team": team,
+                    "name": col.strip(),
+                    "position": None,
+                    "rating": DEFAULT_PLAYER_RATING,
+                }
+
+
+def formation_rows(path: str) -> Iterator[tuple[str, dict[str, Any]]]:
+    metrics: dict[str, list] = {}
+    for r in read_records(path):
+        team = _blank_to_none(r.get("Team"))
+        formation = _blank_to_none(r.get("Formation"))
+        if team is None or formation is None:
+            continue
+        rates = [float(r.get(c) or 0) for c in ("Winning_Rate", "Draw_Rate", "Losing_Rate")]
+        metrics.setdefault(team, []).append(
+            {
+                "metric": f"{formation} W/D/L",
+                "value": " / ".join(f"{round(x * 100)}%" for x in rates),
+            }
+        )
+    for team, items in metrics.items():
+        yield "model_teams", {"name": team, "logo": None}
+        yield "formation_metrics", {"team": team, "metrics": items}
+
+
+def known_team_names(formations_csv: str | None) -> dict[str, str]:
+    if not formations_csv or not os.path.exists(formations_csv):
+        return {}
+    return {_team_key(r["Team"]): r["Team"] for r in read_records(formations_csv) if r.get("Team")}
+
+
+# ----------------------------
+# Staging and merge
+# ----------------------------
+
+class _Stage:
+    """Temporary table for one target, filled in batches."""
+
+    def __init__(self, conn: Connection, target: str):
+        self.conn = conn
+        self.table, self.keys, self.values, self.update_existing = TARGETS[target]
+        self.columns = self.keys + self.values
+        self.stage = Table(
+            f"seed_{target}",
+            MetaData(),
+            *[Column(c, self.table.c[c].type) for c in self.columns],
+            prefixes=["TEMPORARY"],
+        )
+        self.stage.create(conn)
+        self.use_copy = conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg2"
+        self._json = {c for c in self.columns if isinstance(self.table.c[c].type, JSON)}
+        self._batch: list[dict[str, Any]] = []
+        self._seen: set[tuple] = set()
+        self.staged = 0
+        self.duplicates = 0
+        self.skipped = 0
+
+    def add(self, row: dict[str, Any]) -> None:
+        key = tuple(row.get(k) for k in self.keys)
+        if any(k is None for k in key):
+            self.skipped += 1
+            return
+        if key in self._seen:
+            # First occurrence wins within one import. Model-derived targets
+            # overlap by design (every model file names its teams).
+            if self.update_existing:
+                self.duplicates += 1
+            return
+        self._seen.add(key)
+        self._batch.append(row)
+        if len(self._batch) >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._batch:
+            return
+        if self.use_copy:
+            buf = io.StringIO()
+            writer = csv.writer(buf, quoting=csv.QUOTE_NONNUMERIC)
+            for row in self._batch:
+                # QUOTE_NONNUMERIC writes None as an empty unquoted field,
+                # which COPY reads as NULL.
+                writer.writerow(
+                    [json.dumps(row.get(c)) if c in self._json and row.get(c) is not None else row.get(c) for c in self.columns]
+                )
+            buf.seek(0)
+            cursor = self.conn.connection.cursor()
+            try:
+                cursor.copy_expert(
+                    f"COPY {self.stage.name} ({', '.join(self.columns)}) FROM STDIN WITH (FORMAT csv)", buf
+                )
+            finally:
+                cursor.close()
+        else:
+            self.conn.execute(self.stage.insert(), [{c: row.get(c) for c in self.columns} for row in self._batch])
+        self.staged += len(self._batch)
+        self._batch = []
+
+    def merge(self) -> dict[str, int]:
+        self.flush()
+        t, s = self.table.name, self.stage.name
+        match = " AND ".join(f"{t}.{k} = s.{k}" for k in self.keys)
+        assignments = ", ".join(f"{v} = COALESCE(s.{v}, {t}.{v})" for v in self.values)
+        cols = ", ".join(self.columns)
+
+        if self.conn.dialect.name == "postgresql":
+            # Keep concurrent writers from inserting the same keys mid-merge.
+            self.conn.execute(text(f"LOCK TABLE {t} IN SHARE ROW EXCLUSIVE MODE"))
+        updated = 0
+        if self.update_existing:
+            updated = self.conn.execute(text(f"UPDATE {t} SET {assignments} FROM {s} AS s WHERE {match}")).rowcount
+        inserted = self.conn.execute(
+            text(
+                f"INSERT INTO {t} ({cols}) SELECT {', '.join('s.' + c for c in self.columns)} FROM {s} AS s "
+                f"WHERE NOT EXISTS (SELECT 1 FROM {t} WHERE {match})"
+            )
+        ).rowcount
+        self.stage.drop(self.conn)
+        return {
+            "rows": self.staged,
+            "inserted": inserted,
+            "updated": updated,
+            "duplicates": self.duplicates,
+            "skipped": self.skipped,
+        }
+
+
+def import_rows(conn: Connection, rows: Iterable[tuple[str, dict[str, Any]]]) -> dict[str, Any]:
+    """Stage `(target, row)` pairs and merge them; returns the per-table report."""
+    stages: dict[str, _Stage] = {}
+    started = time.perf_counter()
+    for target, row in rows:
+        stage = stages.get(target)
+        if stage is None:
+            stage = stages[target] = _Stage(conn, target)
+        stage.add(row)
+
+    report: dict[str, Any] = {}
+    # TARGETS order: explicit sources before the insert-only derived ones.
+    for target in TARGETS:
+        if target in stages:
+            report[target] = stages[target].merge()
+
+    from database.reference_cache import bump_reference_version
+
+    bump_reference_version(conn)
+    seconds = time.perf_counter() - started
+    total = sum(r["rows"] for r in report.values())
+    return {
+        "tables": report,
+        "rows": total,
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(total / seconds) if seconds > 0 else None,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m database.seed", description=__doc__.splitlines()[0])
+    parser.add_argument("--teams", action="append", default=[], metavar="FILE")
+    parser.add_argument("--players", action="append", default=[], metavar="FILE")
+    parser.add_argument("--metrics", action="append", default=[], metavar="FILE")
+    parser.add_argument("--history", action="append", default=[], metavar="FILE")
+    parser.add_argument(
+        "--lineups", action="append", default=[], nargs="?", const=DEFAULT_LINEUPS_DIR, metavar="FILE_OR_DIR"
     )
+    parser.add_argument("--formations", action="append", default=[], metavar="FILE")
+    parser.add_argument("--dry-run", action="store_true", help="stage and merge, then roll back")
+    args = parser.parse_args(argv)
+
+    sources = [args.teams, args.players, args.metrics, args.history, args.lineups, args.formations]
+    if not any(sources):
+        args.formations = [DEFAULT_FORMATIONS_CSV]
+
+    known = {}
+    for path in args.formations or [DEFAULT_FORMATIONS_CSV]:
+        known.update(known_team_names(path))
+
+    def rows():
+        for path in args.formations:
+            yield from formation_rows(path)
+        for path in args.teams:
+            yield from (("teams", r) for r in team_rows(path))
+        for path in args.lineups:
+            yield from lineup_rows(lineup_paths(path), known)
+        for path in args.players:
+            yield from (("players", r) for r in player_rows(path))
+        for path in args.metrics:
+            yield from (("club_metrics", r) for r in metric_rows(path))
+        for path in args.history:
+            yield from (("club_history", r) for r in history_rows(path))
+
+    from database.db import engine
+    from database.migrations import migrate
+
+    try:
+        migrate(engine)
+        conn = engine.connect()
+        try:
+            with conn.begin() as tx:
+                report = import_rows(conn, rows())
+                if args.dry_run:
+                    tx.rollback()
+                    report["dry_run"] = True
+        finally:
+            conn.close()
+    except Exception as e:
+        json.dump({"error": str(e)}, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+        return 1
+
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""Memoized combine_predictions for repeated identical requests.
+
+Build Match users re-run Predict with the same teams, formations and XI many
+times. Results are cached in a bounded LRU with a TTL, keyed on a canonical
+hash of the inputs plus the loaded model version and the formation table
+version, so a hot reload can never serve a stale prediction. The cache is
+also cleared whenever the registry swaps in new models.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from logic.combined_predictor.predict import combine_predictions
+from logic.formation_strength.predict import formation_table_version
+from logic.model_registry import get_models, registry
+
+
+class PredictionCache:
+    """Thread-safe LRU + TTL map with hit/miss counters."""
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.evictions = 0
+
+    def get(self, key: str):
+        """(True, value) on a fresh hit, otherwise (False, None)."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > now:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key: str, value) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def record_bypass(self) -> None:
+        """Count a request that could not be keyed and skipped the cache."""
+        with self._lock:
+            self.bypasses += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypasses": self.bypasses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+def _canonical_value(value):
+    """Numbers (and numeric strings) as one float form; anything else as text.
+
+    The Build Match client sends {slot: "Player Name"}, so values are not
+    necessarily numeric. Returns None for zero, which means "not selected",
+    same as absent.
+    """
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return str(value)
+    return None if number == 0 else repr(number)
+
+
+def _canonical_lineup(player_dict) -> list:
+    pairs = ((str(k), _canonical_value(v)) for k, v in player_dict.items())
+    return sorted([k, v] for k, v in pairs if v is not None)
+
+
+def canonical_key(
+    team_a,
+    team_b,
+    left_formation,
+    right_formation,
+    left_playing_11,
+    right_playing_11,
+    left_rating,
+    right_rating,
+    model_version,
+) -> str:
+    payload = [
+        model_version,
+        formation_table_version(),
+        team_a,
+        team_b,
+        left_formation.strip(),
+        right_formation.strip(),
+        _canonical_lineup(left_playing_11),
+        _canonical_lineup(right_playing_11),
+        float(left_rating),
+        float(right_rating),
+    ]
+    raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+prediction_cache = PredictionCache(
+    maxsize=int(os.getenv("PREDICTION_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("PREDICTION_CACHE_TTL", "300")),
+)
+registry.add_reload_listener(prediction_cache.clear)
+
+
+def cached_combine_predictions(
+    team_a,
+    team_b,
+    left_formation,
+    right_formation,
+    left_playing_11,
+    right_playing_11,
+    left_rating,
+    right_rating
+):
+    """combine_predictions(..., with_probabilities=True) behind the cache."""
+    args = (
+        team_a,
+        team_b,
+        left_formation,
+        right_formation,
+        left_playing_11,
+        right_playing_11,
+        left_rating,
+        right_rating,
+    )
+    try:
+        key = canonical_key(*args, get_models().version)
+    except (TypeError, ValueError, AttributeError):
+        # Not canonicalizable (e.g. a non-string formation): skip the cache
+        # and let the predictor raise its usual error.
+        prediction_cache.record_bypass()
+        return combine_predictions(*args, with_probabilities=True)
+
+    found, value = prediction_cache.get(key)
+    if found:
+        winner, probabilities = value
+        return winner, dict(probabilities)
+
+    winner, probabilities = combine_predictions(*args, with_probabilities=True)
+    prediction_cache.put(key, (winner, dict(probabilities)))
+    return winner, probabilities
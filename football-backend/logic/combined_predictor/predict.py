@@ -1,74 +1,210 @@
-import os
-import joblib
-import pandas as pd
-from logic.formation_strength.predict import get_formation_strength
+import time
 
-# -----------------------------
-# Paths
-# -----------------------------
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+import numpy as np
+from prometheus_client import Histogram
+from scipy import sparse
+from logic.formation_strength.predict import get_formation_strength, team_formation_scores
+from logic.player_strength.features import encode_lineups
+from logic.model_registry import get_models
 
-# History predictor
-history_model_path = os.path.join(BASE_DIR, "..", "history_predictor", "models", "history_model.pkl")
-history_team_encoder_path = os.path.join(BASE_DIR, "..", "history_predictor", "models", "team_encoder.pkl")
-history_winner_encoder_path = os.path.join(BASE_DIR, "..", "history_predictor", "models", "winner_encoder.pkl")
+OUTCOMES = ("Win_A", "Draw", "Win_B")
 
-# Player strength predictor
-strength_model_path = os.path.join(BASE_DIR, "..", "player_strength", "models", "strength_model.pkl")
-strength_result_encoder_path = os.path.join(BASE_DIR, "..", "player_strength", "models", "result_encoder.pkl")
-strength_feature_path = os.path.join(BASE_DIR, "..", "player_strength", "models", "model_columns.pkl")
+# Stages are in-memory lookups and forest walks: tenths of a millisecond
+# for one match, up to a fraction of a second for a large batch.
+STAGE_SECONDS = Histogram(
+    "predictor_stage_seconds",
+    "Time spent in each combined-predictor stage",
+    ("stage", "mode"),
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+# "rating" covers the rating comparison and the final vote/blend.
+_STAGES = {
+    (stage, mode): STAGE_SECONDS.labels(stage, mode)
+    for stage in ("history", "strength", "formation", "rating")
+    for mode in ("single", "batch")
+}
 
 # -----------------------------
-# Load models
+# Predict functions
 # -----------------------------
-history_model = joblib.load(history_model_path)
-history_team_encoder = joblib.load(history_team_encoder_path)
-history_winner_encoder = joblib.load(history_winner_encoder_path)
+# Models come from the shared registry (loaded lazily, once per process).
+# Each entry point takes one bundle snapshot and threads it through, so a
+# single prediction never mixes artifacts from two loads.
+def _history_row(models, team_a, team_b):
+    a_enc = models.history_team_index.get(team_a)
+    b_enc = models.history_team_index.get(team_b)
+    if a_enc is None or b_enc is None:
+        return None
+    return [a_enc, b_enc]
 
-strength_model = joblib.load(strength_model_path)
-strength_result_encoder = joblib.load(strength_result_encoder_path)
-strength_features = joblib.load(strength_feature_path)
 
-# -----------------------------
-# Predict functions
-# -----------------------------
-def predict_history(team_a, team_b):
-    try:
-        a_enc = history_team_encoder.transform([team_a])[0]
-        b_enc = history_team_encoder.transform([team_b])[0]
-    except:
+def _strength_matrix(models, player_dicts):
+    # Sparse rows: cost follows the selected players, not the column count.
+    return encode_lineups(player_dicts, models.strength_feature_index, len(models.strength_features))
+
+
+def _history_proba(models, team_a, team_b):
+    row = _history_row(models, team_a, team_b)
+    if row is None:
         return None
+    # Precomputed for every pair when the bundle loads (ModelBundle.history_matrix).
+    return dict(zip(models.history_labels, models.history_matrix[row[0], row[1]]))
+
+
+def _strength_probas(models, player_dicts):
+    probas = models.strength_forest.predict_proba(_strength_matrix(models, player_dicts))
+    return [dict(zip(models.strength_labels, p)) for p in probas]
+
+
+def predict_history_proba(team_a, team_b, models=None):
+    """Outcome distribution {label: p} from the history forest, or None for unknown teams.
 
-    X = pd.DataFrame([[a_enc, b_enc]], columns=["Team_A_enc", "Team_B_enc"])
-    pred = history_model.predict(X)[0]
-    return history_winner_encoder.inverse_transform([pred])[0]
+    `models` pins a ModelBundle (default: the current one), so callers that
+    already hold one see a consistent set across a hot reload.
+    """
+    return _history_proba(models or get_models(), team_a, team_b)
+
+
+def predict_strength_proba(player_dict):
+    """{"Win"|"Draw"|"Loss": p} for one playing XI."""
+    return _strength_probas(get_models(), [player_dict])[0]
+
+
+def _top_label(proba):
+    if proba is None:
+        return None
+    return max(proba, key=proba.get)
+
+
+def predict_history(team_a, team_b):
+    return _top_label(predict_history_proba(team_a, team_b))
 
 
 def predict_strength(player_dict):
-    row = [player_dict.get(col, 0) for col in strength_features]
-    X = pd.DataFrame([row], columns=strength_features)
-    pred = strength_model.predict(X)[0]
-    return strength_result_encoder.inverse_transform([pred])[0]
+    return _top_label(predict_strength_proba(player_dict))
+
+
+def predict_history_batch(pairs, models=None):
+    """Vectorized predict_history_proba over a list of (team_a, team_b) pairs.
+
+    Unknown teams yield None, mirroring predict_history.
+    """
+    models = models or get_models()
+    results = [None] * len(pairs)
+    rows = [(i, _history_row(models, a, b)) for i, (a, b) in enumerate(pairs)]
+    rows = [(i, r) for i, r in rows if r is not None]
+    if not rows:
+        return results
+
+    a, b = np.array([r for _, r in rows]).T
+    probas = models.history_matrix[a, b]
+    for (i, _), proba in zip(rows, probas):
+        results[i] = dict(zip(models.history_labels, proba))
+    return results
 
 
 # -----------------------------
 # Combined Prediction
 # -----------------------------
-def combine_predictions(
+def history_outcomes(team_a, team_b, hist_proba):
+    """Map history-model labels (team names / Draw) onto Win_A/Draw/Win_B.
+
+    `hist_proba` is a `predict_history_proba` result.
+
+    Mass on teams that are not playing is dropped and the rest renormalized;
+    unknown matchups count as a Draw, like the hard vote.
+    """
+    if hist_proba is None:
+        return {"Win_A": 0.0, "Draw": 1.0, "Win_B": 0.0}
+
+    out = {
+        "Win_A": float(hist_proba.get(team_a, 0.0)),
+        "Draw": float(hist_proba.get("Draw", 0.0)),
+        "Win_B": float(hist_proba.get(team_b, 0.0)),
+    }
+    total = sum(out.values())
+    if total <= 0:
+        return {"Win_A": 0.0, "Draw": 1.0, "Win_B": 0.0}
+    return {k: v / total for k, v in out.items()}
+
+
+def _signal_probabilities(
     team_a,
     team_b,
-    left_formation,
-    right_formation,
-    left_playing_11,
-    right_playing_11,
+    hist_proba,
+    left_proba,
+    right_proba,
     left_rating,
     right_rating
 ):
+    """Unnormalized soft votes of every signal except formation strength."""
+    probs = {"Win_A": 0.0, "Win_B": 0.0, "Draw": 0.0}
+
+    for outcome, p in history_outcomes(team_a, team_b, hist_proba).items():
+        probs[outcome] += 0.35 * p
+
+    probs["Win_A"] += 0.25 * left_proba.get("Win", 0.0)
+    probs["Win_B"] += 0.25 * left_proba.get("Loss", 0.0)
+    probs["Draw"] += 0.25 * left_proba.get("Draw", 0.0)
+
+    probs["Win_B"] += 0.25 * right_proba.get("Win", 0.0)
+    probs["Win_A"] += 0.25 * right_proba.get("Loss", 0.0)
+    probs["Draw"] += 0.25 * right_proba.get("Draw", 0.0)
+
+    rating_diff = left_rating - right_rating
+    probs["Win_A" if rating_diff > 0 else "Win_B" if rating_diff < 0 else "Draw"] += 0.15
+    return probs
+
+
+def combine_probabilities(
+    team_a,
+    team_b,
+    hist_proba,
+    left_proba,
+    right_proba,
+    left_rating,
+    right_rating,
+    left_form_score,
+    right_form_score
+):
+    """{Win_A, Draw, Win_B} for one match from its already computed signals.
+
+    Soft version of the vote: model signals contribute their class
+    probabilities instead of a hard label, with the same weights.
+    `hist_proba` comes from `predict_history_proba`, `left_proba` /
+    `right_proba` from `predict_strength_proba`, and the form scores from
+    `get_formation_strength`.
+    """
+    probs = _signal_probabilities(
+        team_a, team_b, hist_proba, left_proba, right_proba, left_rating, right_rating
+    )
+
+    if left_form_score > right_form_score:
+        probs["Win_A"] += 0.20
+    elif right_form_score > left_form_score:
+        probs["Win_B"] += 0.20
+    else:
+        probs["Draw"] += 0.20
+
+    total = sum(probs.values())
+    return {k: round(float(probs[k] / total), 4) for k in OUTCOMES}
+
+
+def _decide_winner(
+    team_a,
+    team_b,
+    hist_pred,
+    left_strength,
+    right_strength,
+    left_rating,
+    right_rating,
+    left_form_score,
+    right_form_score
+):
 
     votes = {"Win_A": 0.0, "Win_B": 0.0, "Draw": 0.0}
 
     # 1️⃣ Historical matchup
-    hist_pred = predict_history(team_a, team_b)
     if hist_pred == team_a:
         votes["Win_A"] += 0.35
     elif hist_pred == team_b:
@@ -77,9 +213,6 @@ def combine_predictions(
         votes["Draw"] += 0.35
 
     # 2️⃣ Player strength (ML model)
-    left_strength = predict_strength(left_playing_11)
-    right_strength = predict_strength(right_playing_11)
-
     if left_strength == "Win":
         votes["Win_A"] += 0.25
     elif left_strength == "Loss":
@@ -104,9 +237,6 @@ def combine_predictions(
         votes["Draw"] += 0.15
 
     # 4️⃣ Formation strength (NEW 🔥)
-    left_form_score = get_formation_strength(team_a, left_formation)
-    right_form_score = get_formation_strength(team_b, right_formation)
-
     if left_form_score > right_form_score:
         votes["Win_A"] += 0.20
     elif right_form_score > left_form_score:
@@ -124,3 +254,269 @@ def combine_predictions(
         else team_b if winner == "Win_B"
         else "Draw"
     )
+
+
+def combine_predictions(
+    team_a,
+    team_b,
+    left_formation,
+    right_formation,
+    left_playing_11,
+    right_playing_11,
+    left_rating,
+    right_rating,
+    with_probabilities=False
+):
+    """Predict the winner (team_a, team_b or "Draw").
+
+    With `with_probabilities=True`, returns `(winner, probabilities)` where
+    probabilities is {"Win_A", "Draw", "Win_B"} from the models' predict_proba.
+    Both come from the same forest evaluation.
+    """
+    models = get_models()
+    with _STAGES["history", "single"].time():
+        hist_proba = _history_proba(models, team_a, team_b)
+    with _STAGES["strength", "single"].time():
+        # Both lineups in one forest walk
+        left_proba, right_proba = _strength_probas(models, [left_playing_11, right_playing_11])
+    with _STAGES["formation", "single"].time():
+        left_form_score = get_formation_strength(team_a, left_formation)
+        right_form_score = get_formation_strength(team_b, right_formation)
+
+    with _STAGES["rating", "single"].time():
+        winner = _decide_winner(
+            team_a,
+            team_b,
+            _top_label(hist_proba),
+            _top_label(left_proba),
+            _top_label(right_proba),
+            left_rating,
+            right_rating,
+            left_form_score,
+            right_form_score,
+        )
+        if not with_probabilities:
+            return winner
+
+        probabilities = combine_probabilities(
+            team_a,
+            team_b,
+            hist_proba,
+            left_proba,
+            right_proba,
+            left_rating,
+            right_rating,
+            left_form_score,
+            right_form_score,
+        )
+    return winner, probabilities
+
+
+def combine_predictions_batch(matches):
+    """Score many fixtures with one forest evaluation per model.
+
+    `matches` is a list of dicts carrying the combine_predictions arguments
+    (team_a, team_b, left_formation, right_formation, left_playing_11,
+    right_playing_11, left_rating, right_rating).
+
+    Returns one dict per match, in input order: {"winner", "probabilities"}
+    or {"error": ...} when that match could not be scored.
+    """
+    models = get_models()
+    results = [None] * len(matches)
+    valid = []
+    strength_blocks = []
+
+    formation_seconds = 0.0
+    for i, m in enumerate(matches):
+        try:
+            # Encoded per match so one bad lineup fails only its own match.
+            block = _strength_matrix(models, [m["left_playing_11"], m["right_playing_11"]])
+            left_rating = float(m["left_rating"])
+            right_rating = float(m["right_rating"])
+            started = time.perf_counter()
+            left_form_score = get_formation_strength(m["team_a"], m["left_formation"])
+            right_form_score = get_formation_strength(m["team_b"], m["right_formation"])
+            formation_seconds += time.perf_counter() - started
+        except Exception as e:
+            results[i] = {"error": str(e)}
+            continue
+
+        strength_blocks.append(block)
+        valid.append((i, m, left_rating, right_rating, left_form_score, right_form_score))
+
+    _STAGES["formation", "batch"].observe(formation_seconds)
+    if not valid:
+        return results
+
+    try:
+        with _STAGES["history", "batch"].time():
+            hist_probas = predict_history_batch([(m["team_a"], m["team_b"]) for _, m, *_ in valid], models)
+        with _STAGES["strength", "batch"].time():
+            X = sparse.vstack(strength_blocks, format="csr")
+            strength_probas = [
+                dict(zip(models.strength_labels, p)) for p in models.strength_forest.predict_proba(X)
+            ]
+    except Exception as e:
+        for i, *_ in valid:
+            results[i] = {"error": str(e)}
+        return results
+
+    started = time.perf_counter()
+    for n, (i, m, left_rating, right_rating, left_form_score, right_form_score) in enumerate(valid):
+        hist_proba = hist_probas[n]
+        left_proba = strength_probas[2 * n]
+        right_proba = strength_probas[2 * n + 1]
+        results[i] = {
+            "winner": _decide_winner(
+                m["team_a"],
+                m["team_b"],
+                _top_label(hist_proba),
+                _top_label(left_proba),
+                _top_label(right_proba),
+                left_rating,
+                right_rating,
+                left_form_score,
+                right_form_score,
+            ),
+            "probabilities": combine_probabilities(
+                m["team_a"],
+                m["team_b"],
+                hist_proba,
+                left_proba,
+                right_proba,
+                left_rating,
+                right_rating,
+                left_form_score,
+                right_form_score,
+            ),
+        }
+    _STAGES["rating", "batch"].observe(time.perf_counter() - started)
+
+    return results
+
+
+def combine_formation_grid(
+    team_a,
+    team_b,
+    left_playing_11,
+    right_playing_11,
+    left_rating,
+    right_rating,
+    left_scores,
+    right_scores
+):
+    """combine_predictions probabilities for every formation pairing at once.
+
+    `left_scores` / `right_scores` map formation -> formation-strength score
+    (see `team_formation_scores`). The models run once; only the formation
+    vote differs between cells, so the grid is one broadcast over the two
+    score vectors. Returns an (L, R, 3) array in OUTCOMES order, equal cell
+    by cell to `combine_predictions(..., with_probabilities=True)`.
+    """
+    models = get_models()
+    with _STAGES["history", "batch"].time():
+        hist_proba = _history_proba(models, team_a, team_b)
+    with _STAGES["strength", "batch"].time():
+        left_proba, right_proba = _strength_probas(models, [left_playing_11, right_playing_11])
+
+    with _STAGES["rating", "batch"].time():
+        base = _signal_probabilities(
+            team_a, team_b, hist_proba, left_proba, right_proba, left_rating, right_rating
+        )
+        left = np.fromiter(left_scores.values(), dtype=float, count=len(left_scores))
+        right = np.fromiter(right_scores.values(), dtype=float, count=len(right_scores))
+        gap = left[:, None] - right[None, :]
+
+        win_a = base["Win_A"] + 0.20 * (gap > 0)
+        win_b = base["Win_B"] + 0.20 * (gap < 0)
+        draw = base["Draw"] + 0.20 * (gap == 0)
+        total = win_a + win_b + draw
+        return np.stack([win_a / total, draw / total, win_b / total], axis=-1)
+
+
+class FormationGridTooLarge(ValueError):
+    """More formation pairings than the caller may rank."""
+
+
+def recommend_formations(
+    team_a,
+    team_b,
+    left_playing_11=None,
+    right_playing_11=None,
+    left_rating=0.0,
+    right_rating=0.0,
+    opponent_formation=None,
+    max_pairings=None
+):
+    """Rank team_a's formations against team_b.
+
+    Each formation is scored as Win_A + Draw / 2: against `opponent_formation`
+    when given, otherwise averaged over the opponent's known formations. The
+    worst case over the opponent's formations is reported alongside. Raises
+    FormationGridTooLarge when the grid has more than `max_pairings` cells.
+    """
+    left_scores = team_formation_scores(team_a)
+    if not left_scores:
+        raise LookupError(f"No formation data for {team_a}")
+
+    right_scores = team_formation_scores(team_b)
+    if not right_scores:
+        # Unknown formations score 0.0 in the single-match pipeline too.
+        right_scores = {formation: 0.0 for formation in left_scores}
+    if opponent_formation and opponent_formation not in right_scores:
+        right_scores[opponent_formation] = get_formation_strength(team_b, opponent_formation)
+    pairings = len(left_scores) * len(right_scores)
+    if max_pairings is not None and pairings > max_pairings:
+        raise FormationGridTooLarge(f"{pairings} formation pairings (at most {max_pairings})")
+
+    grid = combine_formation_grid(
+        team_a,
+        team_b,
+        left_playing_11 or {},
+        right_playing_11 or {},
+        left_rating,
+        right_rating,
+        left_scores,
+        right_scores,
+    )
+    left_names = list(left_scores)
+    right_names = list(right_scores)
+    share = grid[..., 0] + grid[..., 1] / 2
+
+    if opponent_formation:
+        column = right_names.index(opponent_formation)
+        expected = share[:, column]
+        probabilities = grid[:, column]
+    else:
+        expected = share.mean(axis=1)
+        probabilities = grid.mean(axis=1)
+    worst = share.argmin(axis=1)
+
+    def _probs(row):
+        return {k: round(float(v), 4) for k, v in zip(OUTCOMES, row)}
+
+    recommendations = [
+        {
+            "formation": name,
+            "formation_score": left_scores[name],
+            "score": round(float(expected[i]), 4),
+            "probabilities": _probs(probabilities[i]),
+            "worst_case": round(float(share[i, worst[i]]), 4),
+            "worst_against": right_names[worst[i]],
+        }
+        for i, name in enumerate(left_names)
+    ]
+    recommendations.sort(key=lambda r: (-r["score"], -r["worst_case"], -r["formation_score"], r["formation"]))
+
+    return {
+        "team_a": team_a,
+        "team_b": team_b,
+        "opponent_formation": opponent_formation,
+        "recommendations": recommendations,
+        "grid": [
+            {"left_formation": left, "right_formation": right, "probabilities": _probs(grid[i, j])}
+            for i, left in enumerate(left_names)
+            for j, right in enumerate(right_names)
+        ],
+    }
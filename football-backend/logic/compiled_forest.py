@@ -0,0 +1,115 @@
+import numpy as np
+from scipy import sparse
+
+
+def _sparse_lookup(X):
+    """Value getter for flat (row * n_features + col) positions of a sparse X.
+
+    Stored entries are addressed by their sorted flat position and found with
+    a binary search; anything not stored reads as 0.
+    """
+    X = sparse.csr_matrix(X, dtype=np.float32)
+    X.sum_duplicates()  # canonical CSR: sorted, unique indices per row
+    n_features = X.shape[1]
+    row_ids = np.repeat(np.arange(X.shape[0], dtype=np.int64), np.diff(X.indptr))
+    # A trailing sentinel key/zero value keeps every searchsorted hit in range.
+    keys = np.append(row_ids * n_features + X.indices, np.iinfo(np.int64).max)
+    values = np.append(X.data, np.float32(0))
+
+    def lookup(flat):
+        pos = np.searchsorted(keys, flat)
+        return values[pos] * (keys[pos] == flat)
+
+    return lookup
+
+
+class CompiledForest:
+    """Flattened, array-only form of a fitted RandomForestClassifier.
+
+    Every tree's nodes are concatenated into shared NumPy arrays so a batch of
+    rows walks all trees at once: one fancy-indexing step per tree level
+    instead of sklearn's per-call input validation, joblib dispatch and
+    per-tree Python loop.
+
+    predict_proba matches RandomForestClassifier.predict_proba (mean of the
+    per-tree normalized leaf distributions), and predict returns
+    `classes_[argmax]` like the sklearn estimator.
+    """
+
+    def __init__(self, forest):
+        trees = [est.tree_ for est in forest.estimators_]
+
+        sizes = np.array([t.node_count for t in trees], dtype=np.intp)
+        offsets = np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(np.intp)
+
+        left, right, feature, threshold, value = [], [], [], [], []
+        for t, offset in zip(trees, offsets):
+            node_ids = np.arange(t.node_count, dtype=np.intp) + offset
+            is_leaf = t.children_left == -1
+
+            left.append(np.where(is_leaf, node_ids, t.children_left + offset))
+            right.append(np.where(is_leaf, node_ids, t.children_right + offset))
+            feature.append(np.where(is_leaf, 0, t.feature).astype(np.intp))
+            threshold.append(np.where(is_leaf, np.inf, t.threshold))
+
+            counts = t.value[:, 0, :].astype(np.float64)
+            totals = counts.sum(axis=1, keepdims=True)
+            totals[totals == 0] = 1.0
+            value.append(counts / totals)
+
+        # children[node] = (left, right); leaves point back at themselves.
+        self.children = np.stack([np.concatenate(left), np.concatenate(right)], axis=1)
+        self.is_leaf = self.children[:, 0] == np.arange(len(self.children))
+        self.feature = np.concatenate(feature)
+        self.threshold = np.concatenate(threshold)
+        self.value = np.concatenate(value)
+        self.roots = offsets
+
+        self.classes_ = np.asarray(forest.classes_)
+        self.n_features_in_ = int(forest.n_features_in_)
+
+    def __setstate__(self, state):
+        # Loaded with mmap_mode="r" the arrays arrive as np.memmap. Plain
+        # ndarray views share the same mapping without memmap's Python-level
+        # __getitem__ on every indexing step of the walk.
+        self.__dict__.update(
+            {k: np.asarray(v) if isinstance(v, np.ndarray) else v for k, v in state.items()}
+        )
+
+    def leaves(self, X) -> np.ndarray:
+        """Leaf node ids, shape (n_rows, n_trees).
+
+        `X` may be dense or a SciPy sparse matrix; sparse rows are never
+        densified, so their cost follows the non-zeros, not the column count.
+        """
+        if sparse.issparse(X):
+            n_rows, n_features = X.shape
+            lookup = _sparse_lookup(X)
+        else:
+            # sklearn trees split on float32 features against float64 thresholds.
+            X = np.asarray(X, dtype=np.float32)
+            if X.ndim == 1:
+                X = X.reshape(1, -1)
+            n_rows, n_features = X.shape
+            lookup = X.ravel().__getitem__
+
+        # One slot per (row, tree). Only slots still on a split node are
+        # advanced each level, so shallow trees stop costing work early.
+        row_base = np.repeat(np.arange(n_rows, dtype=np.int64) * n_features, len(self.roots))
+        out = np.tile(self.roots, n_rows)
+        active = np.flatnonzero(~self.is_leaf[out])
+        nodes = out[active]
+        while active.size:
+            go_right = lookup(row_base[active] + self.feature[nodes]) > self.threshold[nodes]
+            nodes = self.children[nodes, go_right.view(np.int8)]
+            done = self.is_leaf[nodes]
+            out[active[done]] = nodes[done]
+            active = active[~done]
+            nodes = nodes[~done]
+        return out.reshape(n_rows, -1)
+
+    def predict_proba(self, X) -> np.ndarray:
+        return self.value[self.leaves(X)].mean(axis=1)
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
@@ -1,36 +1,133 @@
+import logging
+import numpy as np
 import pandas as pd
 import os
+import threading
 
 BASE_DIR = os.path.dirname(__file__)
 DATA_PATH = os.path.join(BASE_DIR, "data", "formation_strength.csv")
 
-df = pd.read_csv(DATA_PATH)
+logger = logging.getLogger("logic.formation_strength")
 
-def get_formation_strength(Team: str, Formation: str):
-    team = Team.strip().lower()
-    formation = Formation.strip()
-    
-    
-
-    df["Team_norm"] = df["Team"].str.strip().str.lower()
-    df["Formation_norm"] = df["Formation"].str.strip()
-
-    row = df[
-        (df["Team_norm"] == team) &
-        (df["Formation_norm"] == formation)
-    ]
-    
-    
-    
-
-    if row.empty:
-        print("❌ Formation NOT FOUND:", team, formation)
-        return 0.0
 
-    win = row.iloc[0]["Winning_Rate"]
-    draw = row.iloc[0]["Draw_Rate"]
-    lose = row.iloc[0]["Losing_Rate"]
+def _normalize_team(team: str) -> str:
+    return team.strip().lower()
+
+
+def _normalize_formation(formation: str) -> str:
+    return formation.strip()
+
+
+def _score(win: float, draw: float, lose: float) -> float:
+    return round((win * 1.0) + (draw * 0.4) - (lose * 0.6), 3)
+
+
+def _build_index(path: str) -> dict[tuple[str, str], float]:
+    """Read the CSV once and precompute every (team, formation) score.
+
+    The first row wins on duplicate keys, matching the old `row.iloc[0]` scan.
+    """
+    df = pd.read_csv(path)
+    index: dict[tuple[str, str], float] = {}
+    for team, formation, win, draw, lose in zip(
+        df["Team"], df["Formation"], df["Winning_Rate"], df["Draw_Rate"], df["Losing_Rate"]
+    ):
+        key = (_normalize_team(str(team)), _normalize_formation(str(formation)))
+        if key not in index:
+            index[key] = _score(float(win), float(draw), float(lose))
+    return index
+
+
+def _file_signature(path: str):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+# The published index is never mutated: a reload builds a fresh dict and
+# swaps the reference, so readers on other threads always see a complete table.
+_INDEX: dict[tuple[str, str], float] = _build_index(DATA_PATH)
+_INDEX_SIGNATURE = _file_signature(DATA_PATH)
+_RELOAD_LOCK = threading.Lock()
+
+
+def _current_index() -> dict[tuple[str, str], float]:
+    global _INDEX, _INDEX_SIGNATURE
+
+    try:
+        signature = _file_signature(DATA_PATH)
+    except OSError:
+        # CSV temporarily missing (e.g. mid-replace): keep serving the last table.
+        return _INDEX
+
+    if signature != _INDEX_SIGNATURE and _RELOAD_LOCK.acquire(blocking=False):
+        try:
+            if signature != _INDEX_SIGNATURE:
+                try:
+                    _INDEX = _build_index(DATA_PATH)
+                except Exception as e:
+                    logger.warning("Formation CSV reload failed, keeping previous table: %s", e)
+                _INDEX_SIGNATURE = signature
+        finally:
+            _RELOAD_LOCK.release()
 
-    score = (win * 1.0) + (draw * 0.4) - (lose * 0.6)
-    return round(score, 3)
+    return _INDEX
+
+
+def formation_table_version():
+    """Changes whenever the CSV-backed table is rebuilt (for derived caches)."""
+    _current_index()
+    return _INDEX_SIGNATURE
+
+
+_MATRIX = None
+_MATRIX_LOCK = threading.Lock()
+
+
+def _build_matrix(index: dict[tuple[str, str], float]):
+    teams = sorted({team for team, _ in index})
+    formations = sorted({formation for _, formation in index})
+    team_pos = {team: i for i, team in enumerate(teams)}
+    formation_pos = {formation: i for i, formation in enumerate(formations)}
+    scores = np.full((len(teams), len(formations)), np.nan)
+    for (team, formation), score in index.items():
+        scores[team_pos[team], formation_pos[formation]] = score
+    scores.setflags(write=False)
+    return team_pos, formations, scores
+
+
+def formation_matrix():
+    """(team -> row, formations, scores) for the whole table.
+
+    `scores[row, j]` is the score of `formations[j]` for that team, NaN where
+    the CSV has no row. Rebuilt only when the table itself is rebuilt.
+    """
+    global _MATRIX
+    index = _current_index()
+    cached = _MATRIX
+    if cached is None or cached[0] is not index:
+        with _MATRIX_LOCK:
+            cached = _MATRIX
+            if cached is None or cached[0] is not index:
+                cached = _MATRIX = (index, _build_matrix(index))
+    return cached[1]
+
+
+def team_formation_scores(Team: str):
+    """{formation: score} for every formation the table has for Team."""
+    team_pos, formations, scores = formation_matrix()
+    row = team_pos.get(_normalize_team(Team))
+    if row is None:
+        return {}
+    return {f: float(s) for f, s in zip(formations, scores[row]) if not np.isnan(s)}
+
+
+def get_formation_strength(Team: str, Formation: str):
+    key = (_normalize_team(Team), _normalize_formation(Formation))
+    score = _current_index().get(key)
+
+    if score is None:
+        # Unknown pairings are routine (custom teams, rare formations): debug only.
+        logger.debug("Formation not found: %s %s", key[0], key[1])
+        return 0.0
 
+    return score
@@ -1,27 +1,44 @@
-import pandas as pd
-import joblib
-import os
+from logic.combined_predictor.predict import history_outcomes
+from logic.model_registry import get_models
 
-BASE_DIR = os.path.dirname(__file__)
-MODEL_DIR = os.path.join(BASE_DIR, "models")
-
-# Load model + encoders
-model = joblib.load(os.path.join(MODEL_DIR, "history_model.pkl"))
-team_encoder = joblib.load(os.path.join(MODEL_DIR, "team_encoder.pkl"))
-winner_encoder = joblib.load(os.path.join(MODEL_DIR, "winner_encoder.pkl"))
+# Model + encoders come from the shared registry (see logic/model_registry.py).
+# Every pair's output is precomputed there (history_matrix), so lookups are
+# array indexing rather than a forest evaluation.
 
 def predict_result(teamA, teamB):
-    try:
-        a = team_encoder.transform([teamA])[0]
-        b = team_encoder.transform([teamB])[0]
-    except:
+    models = get_models()
+    a = models.history_team_index.get(teamA)
+    b = models.history_team_index.get(teamB)
+    if a is None or b is None:
         return "Unknown team — add to historical dataset!"
 
-    X_input = pd.DataFrame([[a, b]], columns=["Team_A_enc", "Team_B_enc"])
-    pred = model.predict(X_input)[0]
-    winner = winner_encoder.inverse_transform([pred])[0]
+    return models.history_labels[models.history_matrix[a, b].argmax()]
+
+
+def head_to_head(teamA, teamB):
+    """Model view and recorded results for one pairing, or None for unknown teams."""
+    models = get_models()
+    a = models.history_team_index.get(teamA)
+    b = models.history_team_index.get(teamB)
+    if a is None or b is None:
+        return None
 
-    return winner
+    proba = models.history_matrix[a, b]
+    outcomes = history_outcomes(teamA, teamB, dict(zip(models.history_labels, proba)))
+    wins, draws, losses = (int(x) for x in models.head_to_head[a, b])
+    return {
+        "team_a": teamA,
+        "team_b": teamB,
+        "prediction": models.history_labels[proba.argmax()],
+        # Mass on teams not in this match dropped, as in the combined predictor.
+        "probabilities": {k: round(float(v), 4) for k, v in outcomes.items()},
+        "record": {
+            "played": wins + draws + losses,
+            "team_a_wins": wins,
+            "draws": draws,
+            "team_b_wins": losses,
+        },
+    }
 
 # Example usage
 if __name__ == "__main__":
@@ -1,21 +1,37 @@
-import pandas as pd
 import joblib
 from sklearn.preprocessing import LabelEncoder
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
+import json
 import os
 
+from logic.model_registry import create_version_dir, publish_version
+from logic.training import StageTimer, hash_inputs, is_up_to_date, read_inputs, write_manifest
+
 # Paths
 BASE_DIR = os.path.dirname(__file__)
 DATA_PATH = os.path.join(BASE_DIR, "data", "history_matches.csv")
 MODEL_DIR = os.path.join(BASE_DIR, "models")
 
-# Create models folder if not exists
-os.makedirs(MODEL_DIR, exist_ok=True)
 
-def train_history_model():
-    print("📘 Loading dataset...")
-    df = pd.read_csv(DATA_PATH)
+def train_history_model(n_jobs=None, n_estimators=200, force=False):
+    """Train the head-to-head model and publish it as a new version.
+
+    Returns a JSON-serializable report (timings, accuracy, version). Skips
+    training when the input hash and parameters match the published version,
+    unless `force` is set.
+    """
+    timer = StageTimer()
+    params = {"n_estimators": n_estimators, "random_state": 42, "test_size": 0.2}
+
+    inputs = hash_inputs([DATA_PATH])
+    timer.lap("hash")
+
+    if not force and is_up_to_date(MODEL_DIR, inputs, params):
+        return {"model": "history", "skipped": True, "inputs": inputs, "timings": timer.report()}
+
+    (df,) = read_inputs([DATA_PATH])
+    timer.lap("ingest")
 
     # Label encoders
     team_encoder = LabelEncoder()
@@ -32,19 +48,34 @@ def train_history_model():
         X, y, test_size=0.2, random_state=42
     )
 
-    print("🏋️ Training model...")
-    model = RandomForestClassifier(n_estimators=200, random_state=42)
+    model = RandomForestClassifier(n_estimators=n_estimators, random_state=42, n_jobs=n_jobs)
     model.fit(X_train, y_train)
+    timer.lap("train")
+
+    accuracy = float(model.score(X_test, y_test))
+    timer.lap("evaluate")
 
-    accuracy = model.score(X_test, y_test)
-    print(f"✅ Model trained. Accuracy: {accuracy:.2f}")
+    # Save model + encoders into a fresh version, then publish it so the
+    # running API hot-swaps to it (see logic/model_registry.py)
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    version, version_dir = create_version_dir(MODEL_DIR)
+    joblib.dump(model, os.path.join(version_dir, "history_model.pkl"))
+    joblib.dump(team_encoder, os.path.join(version_dir, "team_encoder.pkl"))
+    joblib.dump(winner_encoder, os.path.join(version_dir, "winner_encoder.pkl"))
+    write_manifest(version_dir, {"inputs": inputs, "params": params, "accuracy": accuracy})
+    publish_version(MODEL_DIR, version)
+    timer.lap("save")
 
-    # Save model + encoders
-    joblib.dump(model, os.path.join(MODEL_DIR, "history_model.pkl"))
-    joblib.dump(team_encoder, os.path.join(MODEL_DIR, "team_encoder.pkl"))
-    joblib.dump(winner_encoder, os.path.join(MODEL_DIR, "winner_encoder.pkl"))
+    return {
+        "model": "history",
+        "skipped": False,
+        "version": version,
+        "rows": int(len(df)),
+        "accuracy": round(accuracy, 4),
+        "inputs": inputs,
+        "timings": timer.report(),
+    }
 
-    print("💾 Saved model and encoders successfully.")
 
 if __name__ == "__main__":
-    train_history_model()
+    print(json.dumps(train_history_model()))
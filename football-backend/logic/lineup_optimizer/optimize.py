@@ -0,0 +1,219 @@
+"""Best-XI search for a formation.
+
+A formation like "4-2-3-1" is split into role groups: one goalkeeper, the
+first number as defenders, the last as forwards and everything in between
+as midfielders. A player's natural role comes from the normalized position
+("Goalkeeper", "Defender", ...). Players with an unknown position fit any
+outfield group. Out of position they count at the frontend's reduced
+ratings (x0.8, or x0.5 in goal).
+
+The search is a beam over the role groups. Each step extends every kept
+partial lineup with every combination of its group's best candidates. All
+the new partial lineups are scored in one forest evaluation and only the
+best `beam_width` are kept. The forest reads player presence, so partial
+lineups are valid inputs; a partial score estimates the finished XI and
+is used to prune. The finished XIs are then ranked by:
+
+    STRENGTH_WEIGHT * (P(Win) + P(Draw) / 2) + RATING_WEIGHT * rating / 100
+
+where the probabilities come from the strength model and rating is the
+average adjusted rating, as shown in Build Match.
+"""
+
+from itertools import combinations
+
+import numpy as np
+from scipy import sparse
+
+from logic.combined_predictor.predict import combine_probabilities, predict_history_proba
+from logic.formation_strength.predict import get_formation_strength
+
+ROLES = ("Goalkeeper", "Defender", "Midfielder", "Forward")
+
+STRENGTH_WEIGHT = 0.75
+RATING_WEIGHT = 0.25
+CROSS_POSITION_MULTIPLIER = 0.8
+GOALKEEPER_MULTIPLIER = 0.5
+DEFAULT_RATING = 70
+
+# Candidates considered per role group (best by adjusted rating); bounds the
+# combinations each beam step has to score.
+CANDIDATES_PER_ROLE = 8
+
+
+def formation_roles(formation: str) -> dict[str, int]:
+    """{"Goalkeeper": 1, "Defender": 4, ...} for an "a-b-c" formation string."""
+    try:
+        lines = [int(x) for x in (formation or "").strip().split("-")]
+    except ValueError:
+        raise ValueError(f"Invalid formation: {formation!r}")
+    if len(lines) < 2 or any(n <= 0 for n in lines) or sum(lines) != 10:
+        raise ValueError(f"Invalid formation: {formation!r}")
+    return {
+        "Goalkeeper": 1,
+        "Defender": lines[0],
+        "Midfielder": sum(lines[1:-1]),
+        "Forward": lines[-1],
+    }
+
+
+def adjusted_rating(rating, position: str, role: str) -> float:
+    rating = float(rating if rating is not None else DEFAULT_RATING)
+    if position not in ROLES or position == role:
+        return rating
+    if role == "Goalkeeper":
+        return rating * GOALKEEPER_MULTIPLIER
+    return rating * CROSS_POSITION_MULTIPLIER
+
+
+def _candidates(players, role: str) -> tuple[list[int], list[int]]:
+    """(natural, others) player indices for `role`, best adjusted rating first.
+
+    Unknown positions count as natural for outfield roles; out-of-position
+    players are only used when the natural ones cannot fill the group.
+    """
+    by_rating = sorted(
+        range(len(players)),
+        key=lambda i: -adjusted_rating(players[i]["rating"], players[i]["position"], role),
+    )
+    natural, others = [], []
+    for i in by_rating:
+        position = players[i]["position"]
+        fits = position == role or (position not in ROLES and role != "Goalkeeper")
+        (natural if fits else others).append(i)
+    return natural, others
+
+
+def _score(models, columns, states, rating_totals, n_selected):
+    """Ranking score and strength probabilities for a batch of (partial) XIs.
+
+    `states` is an (n, n_selected) array of player indices. The forest only
+    sees which players are present, so lineups that select the same players
+    (in different roles) are evaluated once.
+    """
+    selected = np.sort(columns[states], axis=1)
+    unique, inverse = np.unique(selected, axis=0, return_inverse=True)
+    present = unique >= 0
+    X = sparse.csr_matrix(
+        (
+            np.ones(int(present.sum()), dtype=np.float32),
+            unique[present],
+            np.concatenate([[0], np.cumsum(present.sum(axis=1))]),
+        ),
+        shape=(len(unique), len(models.strength_features)),
+    )
+    proba = models.strength_forest.predict_proba(X)[inverse.ravel()]
+
+    labels = models.strength_labels
+    win = proba[:, labels.index("Win")] if "Win" in labels else 0.0
+    draw = proba[:, labels.index("Draw")] if "Draw" in labels else 0.0
+    ratings = rating_totals / max(n_selected, 1)
+    return STRENGTH_WEIGHT * (win + draw / 2) + RATING_WEIGHT * ratings / 100, proba
+
+
+def _best_distinct(states, scores, limit):
+    """Indices of the `limit` best states, one per distinct set of players.
+
+    Players with an unknown position fit several groups, so the same players
+    can appear in different role assignments. Those states have the same
+    options left, so only the best-scoring assignment is worth keeping.
+    """
+    order = np.argsort(-scores, kind="stable")
+    _, first = np.unique(np.sort(states[order], axis=1), axis=0, return_index=True)
+    return order[np.sort(first)][:limit]
+
+
+def optimize_lineup(models, players, formation: str, top_k: int = 5, beam_width: int = 64):
+    """Top-k XIs for `formation` from `players` ([{name, position, rating}]).
+
+    `position` must already be normalized to one of ROLES (anything else is
+    treated as unknown). Returns a list of dicts, best first.
+    """
+    roles = formation_roles(formation)
+    seen = set()
+    players = [p for p in players if p.get("name") and not (p["name"] in seen or seen.add(p["name"]))]
+    if len(players) < 11:
+        raise ValueError(f"Need at least 11 players, got {len(players)}")
+
+    # Strength-model column of each player (-1: unknown to the model).
+    columns = np.array([models.strength_feature_index.get(p["name"], -1) for p in players])
+    ratings = {
+        role: np.array([adjusted_rating(p["rating"], p["position"], role) for p in players]) for role in ROLES
+    }
+
+    # Each state is a row of player indices in fixed role order (combinations
+    # within a group). Players of unknown position can reach the same XI in
+    # several role assignments; _best_distinct keeps one per player set.
+    states = np.zeros((1, 0), dtype=np.int64)
+    totals = np.zeros(1)
+    slot_roles: list[str] = []
+    for role in ROLES:
+        size = roles[role]
+        if size == 0:
+            continue
+        natural, others = _candidates(players, role)
+
+        blocks, parents = [], []
+        for b, state in enumerate(states):
+            used = set(state.tolist())
+            pool = [i for i in natural if i not in used][: max(CANDIDATES_PER_ROLE, size)]
+            if len(pool) < size:
+                pool += [i for i in others if i not in used][: size - len(pool)]
+            groups = np.array(list(combinations(pool, size)), dtype=np.int64).reshape(-1, size)
+            blocks.append(groups)
+            parents.append(np.full(len(groups), b))
+        groups = np.concatenate(blocks)
+        if not len(groups):
+            raise ValueError(f"Not enough players to fill {formation}")
+
+        parents = np.concatenate(parents)
+        states = np.hstack([states[parents], groups])
+        totals = totals[parents] + ratings[role][groups].sum(axis=1)
+        slot_roles += [role] * size
+
+        scores, proba = _score(models, columns, states, totals, len(slot_roles))
+        keep = _best_distinct(states, scores, beam_width if len(slot_roles) < 11 else top_k)
+        states, totals, scores, proba = states[keep], totals[keep], scores[keep], proba[keep]
+
+    results = []
+    for state, total, score, p in zip(states.tolist(), totals, scores, proba):
+        results.append(
+            {
+                "score": round(float(score), 4),
+                "rating": round(float(total / len(slot_roles)), 2),
+                "strength": {label: round(float(x), 4) for label, x in zip(models.strength_labels, p)},
+                "lineup": [
+                    {
+                        "name": players[i]["name"],
+                        "position": players[i]["position"] or None,
+                        "role": role,
+                        "rating": round(float(ratings[role][i]), 2),
+                    }
+                    for i, role in zip(state, slot_roles)
+                ],
+            }
+        )
+    return results
+
+
+def versus_opponent(models, team, formation, results, opponent, opponent_formation, opponent_xi):
+    """Combined Win_A/Draw/Win_B of each result against `opponent_xi`.
+
+    `opponent_xi` is an `optimize_lineup` result for the opponent (its best
+    XI). Sets `result["versus"]` in place.
+    """
+    hist_proba = predict_history_proba(team, opponent, models)
+    form_score = get_formation_strength(team, formation)
+    opponent_form_score = get_formation_strength(opponent, opponent_formation)
+    for result in results:
+        result["versus"] = combine_probabilities(
+            team,
+            opponent,
+            hist_proba,
+            result["strength"],
+            opponent_xi["strength"],
+            result["rating"],
+            opponent_xi["rating"],
+            form_score,
+            opponent_form_score,
+        )
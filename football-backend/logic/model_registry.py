@@ -0,0 +1,322 @@
+"""Process-wide registry for the trained model artifacts.
+
+Every predictor reads its models from here instead of calling `joblib.load`
+at import time, so importing the API is cheap and each artifact exists once
+per process. The first `get_models()` call (or the startup warm-up thread)
+loads the full set.
+
+Training publishes each run into `models/versions/<version>/` and then
+atomically points `models/CURRENT` at it; without a CURRENT file the
+artifacts directly under `models/` are used. `ModelRegistry.reload()` (or
+the watcher) builds the new bundle on a background thread and swaps the
+reference in one assignment, so in-flight predictions finish on the bundle
+they started with and requests never wait on a reload.
+
+Forests are served through `CompiledForest`. The compiled node arrays are
+cached next to each pickle as an uncompressed `*.compiled.joblib` file and
+loaded with `mmap_mode="r"`, so every uvicorn worker maps the same pages
+instead of holding its own copy of the trees.
+"""
+
+import os
+import threading
+import time
+import uuid
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from logic.compiled_forest import CompiledForest
+from logic.player_strength.features import build_feature_index
+
+LOGIC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+HISTORY_MODEL_DIR = os.path.join(LOGIC_DIR, "history_predictor", "models")
+STRENGTH_MODEL_DIR = os.path.join(LOGIC_DIR, "player_strength", "models")
+HISTORY_DATA_PATH = os.path.join(LOGIC_DIR, "history_predictor", "data", "history_matches.csv")
+
+COMPILED_SUFFIX = ".compiled.joblib"
+CURRENT_POINTER = "CURRENT"
+VERSIONS_DIR = "versions"
+BASE_VERSION = "base"
+
+
+def resolve_model_dir(model_dir: str) -> tuple[str, str]:
+    """(version, directory) currently published under `model_dir`."""
+    try:
+        with open(os.path.join(model_dir, CURRENT_POINTER), "r", encoding="utf-8") as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return BASE_VERSION, model_dir
+
+    path = os.path.join(model_dir, VERSIONS_DIR, version)
+    if version and os.path.isdir(path):
+        return version, path
+    return BASE_VERSION, model_dir
+
+
+def create_version_dir(model_dir: str) -> tuple[str, str]:
+    """Make an empty, unpublished version directory for a training run."""
+    version = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime()) + "-" + uuid.uuid4().hex[:6]
+    path = os.path.join(model_dir, VERSIONS_DIR, version)
+    os.makedirs(path)
+    return version, path
+
+
+def publish_version(model_dir: str, version: str) -> None:
+    """Atomically point `model_dir/CURRENT` at a fully written version."""
+    pointer = os.path.join(model_dir, CURRENT_POINTER)
+    tmp_path = f"{pointer}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(version + "\n")
+    os.replace(tmp_path, pointer)
+
+
+def published_versions() -> dict[str, str]:
+    return {
+        "history": resolve_model_dir(HISTORY_MODEL_DIR)[0],
+        "strength": resolve_model_dir(STRENGTH_MODEL_DIR)[0],
+    }
+
+
+def _signature(path: str):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def load_artifact(path: str):
+    # Arrays in uncompressed joblib pickles come back as read-only memmaps;
+    # compressed pickles are loaded normally.
+    return joblib.load(path, mmap_mode="r")
+
+
+def load_compiled_forest(path: str) -> CompiledForest:
+    """Load `path` (a pickled RandomForestClassifier) as a CompiledForest.
+
+    Reuses the compiled cache when it was built from the current pickle,
+    otherwise compiles once and writes the cache atomically.
+    """
+    cache_path = path + COMPILED_SUFFIX
+    source = _signature(path)
+
+    try:
+        cached = load_artifact(cache_path)
+        if cached.get("source") == source:
+            return cached["forest"]
+    except Exception:
+        pass
+
+    forest = CompiledForest(load_artifact(path))
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        joblib.dump({"source": source, "forest": forest}, tmp_path)
+        os.replace(tmp_path, cache_path)
+        return load_artifact(cache_path)["forest"]
+    except Exception:
+        # Read-only model dir: serve the in-memory copy.
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return forest
+
+
+def _history_matrix(forest, n_teams: int) -> np.ndarray:
+    """predict_proba for every (team_a, team_b) pair: shape (N, N, n_labels)."""
+    a, b = np.meshgrid(np.arange(n_teams), np.arange(n_teams), indexing="ij")
+    rows = np.column_stack([a.ravel(), b.ravel()])
+    matrix = np.ascontiguousarray(forest.predict_proba(rows).reshape(n_teams, n_teams, -1))
+    matrix.setflags(write=False)
+    return matrix
+
+
+def _head_to_head_records(team_index: dict, path: str = HISTORY_DATA_PATH) -> np.ndarray:
+    """Results from the history CSV, indexed like the history encoder.
+
+    `records[i, j]` is (wins of i over j, draws, wins of j over i) across
+    all meetings, whichever side was listed first. Missing data gives zeros.
+    """
+    n = len(team_index)
+    records = np.zeros((n, n, 3), dtype=np.int32)
+    try:
+        df = pd.read_csv(path)
+    except (OSError, ValueError):
+        return records
+
+    for team_a, team_b, winner in zip(df["Team_A"], df["Team_B"], df["Winner"]):
+        i = team_index.get(team_a)
+        j = team_index.get(team_b)
+        if i is None or j is None:
+            continue
+        if winner == team_a:
+            outcome = 0
+        elif winner == team_b:
+            outcome = 2
+        else:
+            outcome = 1
+        records[i, j, outcome] += 1
+        records[j, i, 2 - outcome] += 1
+    records.setflags(write=False)
+    return records
+
+
+class ModelBundle:
+    """One consistent, immutable set of loaded models plus derived lookups."""
+
+    def __init__(self):
+        started = time.perf_counter()
+
+        history_version, history_dir = resolve_model_dir(HISTORY_MODEL_DIR)
+        strength_version, strength_dir = resolve_model_dir(STRENGTH_MODEL_DIR)
+        self.versions = {"history": history_version, "strength": strength_version}
+        self.version = f"history={history_version},strength={strength_version}"
+
+        self.history_forest = load_compiled_forest(os.path.join(history_dir, "history_model.pkl"))
+        self.history_team_encoder = load_artifact(os.path.join(history_dir, "team_encoder.pkl"))
+        self.history_winner_encoder = load_artifact(os.path.join(history_dir, "winner_encoder.pkl"))
+
+        self.strength_forest = load_compiled_forest(os.path.join(strength_dir, "strength_model.pkl"))
+        self.strength_team_encoder = load_artifact(os.path.join(strength_dir, "team_encoder.pkl"))
+        self.strength_result_encoder = load_artifact(os.path.join(strength_dir, "result_encoder.pkl"))
+        self.strength_features = list(load_artifact(os.path.join(strength_dir, "model_columns.pkl")))
+
+        self.history_team_index = {team: i for i, team in enumerate(self.history_team_encoder.classes_)}
+        self.strength_team_index = {team: i for i, team in enumerate(self.strength_team_encoder.classes_)}
+        self.strength_feature_index = build_feature_index(self.strength_features)
+
+        # Outcome label for each predict_proba column
+        self.history_labels = list(self.history_winner_encoder.inverse_transform(self.history_forest.classes_))
+        self.strength_labels = list(self.strength_result_encoder.inverse_transform(self.strength_forest.classes_))
+
+        # The history model only ever sees a pair of encoded teams, so its
+        # whole output space is an N x N table: evaluate it once here.
+        self.history_matrix = _history_matrix(self.history_forest, len(self.history_team_index))
+        self.head_to_head = _head_to_head_records(self.history_team_index)
+
+        self.load_seconds = time.perf_counter() - started
+        self.loaded_at = time.time()
+
+
+class ModelRegistry:
+    """Lazily loads one ModelBundle per process, shares it, and hot-swaps it."""
+
+    def __init__(self):
+        self._bundle: ModelBundle | None = None
+        self._lock = threading.Lock()
+        self._error: str | None = None
+        self._warm_thread: threading.Thread | None = None
+        self._reload_thread: threading.Thread | None = None
+        self._watch_thread: threading.Thread | None = None
+        self._reload_listeners: list = []
+
+    def get(self) -> ModelBundle:
+        bundle = self._bundle
+        if bundle is not None:
+            return bundle
+
+        with self._lock:
+            if self._bundle is None:
+                try:
+                    self._bundle = ModelBundle()
+                    self._error = None
+                except Exception as e:
+                    self._error = str(e)
+                    raise
+            return self._bundle
+
+    def start_warm_up(self) -> None:
+        """Load the models on a background thread (no-op once started)."""
+        if self._bundle is not None or self._warm_thread is not None:
+            return
+
+        def _warm():
+            try:
+                self.get()
+            except Exception:
+                # Recorded in status(); requests retry the load on demand.
+                pass
+
+        self._warm_thread = threading.Thread(target=_warm, name="model-warm-up", daemon=True)
+        self._warm_thread.start()
+
+    def _reload(self) -> None:
+        try:
+            bundle = ModelBundle()
+        except Exception as e:
+            # Keep serving the previous bundle.
+            self._error = f"reload failed: {e}"
+            return
+        with self._lock:
+            self._bundle = bundle
+            self._error = None
+
+        for listener in list(self._reload_listeners):
+            try:
+                listener()
+            except Exception:
+                pass
+
+    def add_reload_listener(self, listener) -> None:
+        """Call `listener()` after every hot swap (e.g. to drop derived caches)."""
+        self._reload_listeners.append(listener)
+
+    def reload(self) -> bool:
+        """Load the published artifacts in the background and swap them in.
+
+        Returns False if a reload is already running.
+        """
+        with self._lock:
+            if self._reload_thread is not None and self._reload_thread.is_alive():
+                return False
+            self._reload_thread = threading.Thread(target=self._reload, name="model-reload", daemon=True)
+            self._reload_thread.start()
+            return True
+
+    def check_for_update(self) -> bool:
+        """Start a reload if training published a version we are not serving."""
+        bundle = self._bundle
+        if bundle is None:
+            return False
+        try:
+            versions = published_versions()
+        except OSError:
+            return False
+        if versions == bundle.versions:
+            return False
+        return self.reload()
+
+    def start_watcher(self, interval: float) -> None:
+        """Poll the CURRENT pointers every `interval` seconds (no-op if <= 0)."""
+        if interval <= 0 or self._watch_thread is not None:
+            return
+
+        def _watch():
+            while True:
+                time.sleep(interval)
+                self.check_for_update()
+
+        self._watch_thread = threading.Thread(target=_watch, name="model-watcher", daemon=True)
+        self._watch_thread.start()
+
+    @property
+    def ready(self) -> bool:
+        return self._bundle is not None
+
+    def status(self) -> dict:
+        bundle = self._bundle
+        reload_thread = self._reload_thread
+        return {
+            "ready": bundle is not None,
+            "version": bundle.version if bundle is not None else None,
+            "load_seconds": round(bundle.load_seconds, 3) if bundle is not None else None,
+            "reloading": reload_thread is not None and reload_thread.is_alive(),
+            "error": self._error,
+        }
+
+
+registry = ModelRegistry()
+
+
+def get_models() -> ModelBundle:
+    return registry.get()
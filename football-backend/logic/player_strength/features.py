@@ -0,0 +1,91 @@
+"""Sparse player-presence features for the strength model.
+
+Every player in the league is one 0/1 column (plus the trailing `Team_enc`
+column), but a lineup only sets the ~11 players actually selected. Rows are
+built as CSR matrices straight from a name -> column index map, so both
+training and inference cost scales with the selected players, never with
+the total number of columns.
+"""
+
+import numpy as np
+from scipy import sparse
+
+TEAM_COLUMN = "Team_enc"
+
+
+def build_feature_index(columns) -> dict[str, int]:
+    return {col: i for i, col in enumerate(columns)}
+
+
+def encode_lineups(lineups, feature_index: dict[str, int], n_features: int) -> sparse.csr_matrix:
+    """CSR matrix with one row per `{column_name: value}` dict.
+
+    Unknown names and zero values are skipped; values must be numeric.
+    """
+    indptr = [0]
+    indices: list[int] = []
+    data: list[float] = []
+    for lineup in lineups:
+        for name, val in lineup.items():
+            idx = feature_index.get(name)
+            if idx is None:
+                continue
+            val = float(val)
+            if val:
+                indices.append(idx)
+                data.append(val)
+        indptr.append(len(indices))
+
+    X = sparse.csr_matrix(
+        (np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int64), np.asarray(indptr, dtype=np.int64)),
+        shape=(len(lineups), n_features),
+    )
+    # A dict can't repeat a key, but canonical form (sorted indices) is what
+    # CompiledForest's sparse lookup relies on.
+    X.sort_indices()
+    return X
+
+
+def encode_frames(frames, team_codes):
+    """Build the training matrix from per-team presence DataFrames.
+
+    `frames[i]` holds 0/1 player columns plus `Result`; every row of it gets
+    `team_codes[i]` in the `Team_enc` column. Columns are numbered in
+    first-seen order across frames, with `Team_enc` last.
+
+    Returns (X_csr, feature_columns, results).
+    """
+    feature_index: dict[str, int] = {}
+    for frame in frames:
+        for col in frame.columns:
+            if col.lower() not in ("result", "team") and col not in feature_index:
+                feature_index[col] = len(feature_index)
+    feature_index[TEAM_COLUMN] = len(feature_index)
+    n_features = len(feature_index)
+
+    blocks = []
+    results = []
+    for frame, team_code in zip(frames, team_codes):
+        cols = [c for c in frame.columns if c.lower() not in ("result", "team")]
+        values = frame[cols].fillna(0).to_numpy(dtype=np.float32)
+        rows, local = np.nonzero(values)
+        col_map = np.array([feature_index[c] for c in cols], dtype=np.int64)
+
+        n = len(frame)
+        team_rows = np.arange(n) if team_code else np.empty(0, dtype=np.int64)
+        block = sparse.csr_matrix(
+            (
+                np.concatenate([values[rows, local], np.full(len(team_rows), team_code, dtype=np.float32)]),
+                (
+                    np.concatenate([rows, team_rows]),
+                    np.concatenate([col_map[local], np.full(len(team_rows), feature_index[TEAM_COLUMN])]),
+                ),
+            ),
+            shape=(n, n_features),
+        )
+        blocks.append(block)
+        results.extend(frame["Result"].tolist())
+
+    X = sparse.vstack(blocks, format="csr")
+    X.sort_indices()
+    return X, list(feature_index), results
@@ -1,29 +1,10 @@
-import pandas as pd
-import joblib
-import os
+from logic.model_registry import get_models
+from logic.player_strength.features import TEAM_COLUMN, encode_lineups
 
 # -----------------------------
-# Paths
+# Model, encoders and model columns (saved during training) come from the
+# shared registry (see logic/model_registry.py).
 # -----------------------------
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-MODEL_DIR = os.path.join(BASE_DIR, "models")
-
-model_path = os.path.join(MODEL_DIR, "strength_model.pkl")
-team_encoder_path = os.path.join(MODEL_DIR, "team_encoder.pkl")
-result_encoder_path = os.path.join(MODEL_DIR, "result_encoder.pkl")
-
-# -----------------------------
-# Load model + encoders
-# -----------------------------
-model = joblib.load(model_path)
-team_encoder = joblib.load(team_encoder_path)
-result_encoder = joblib.load(result_encoder_path)
-
-# -----------------------------
-# Load model columns (saved during training)
-# -----------------------------
-columns_path = os.path.join(MODEL_DIR, "model_columns.pkl")
-model_columns = joblib.load(columns_path)  # List of columns used in training
 
 # -----------------------------
 # Prediction function
@@ -33,24 +14,21 @@ def predict_strength(team_name, player_dict):
     team_name -> "Barcelona", "PSG", etc.
     player_dict -> {"M_ter_Stegen":1, "J_Kounde":1, ...}
     """
+    models = get_models()
 
-    if team_name not in team_encoder.classes_:
+    team_enc = models.strength_team_index.get(team_name)
+    if team_enc is None:
         return "Unknown team — add to dataset!"
 
-    team_enc = team_encoder.transform([team_name])[0]
-
-    # Build input row with correct column order
-    row = []
-    for col in model_columns:
-        if col == "Team_enc":
-            row.append(team_enc)
-        else:
-            # Missing player? Fill with 0
-            row.append(player_dict.get(col, 0))
-
-    X_input = pd.DataFrame([row], columns=model_columns)
+    # Sparse row: only the selected players (plus the team code) are set;
+    # missing players read as 0
+    X_input = encode_lineups(
+        [{**player_dict, TEAM_COLUMN: team_enc}],
+        models.strength_feature_index,
+        len(models.strength_features),
+    )
 
-    pred = model.predict(X_input)[0]
-    result = result_encoder.inverse_transform([pred])[0]
+    pred = models.strength_forest.predict(X_input)[0]
+    result = models.strength_result_encoder.inverse_transform([pred])[0]
 
     return result
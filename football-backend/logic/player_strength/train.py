@@ -1,65 +1,100 @@
-import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import LabelEncoder
 import joblib
+import json
 import os
 
-# -----------------------------
-# 1. Load CSVs
-# -----------------------------
+from logic.model_registry import create_version_dir, publish_version
+from logic.player_strength.features import encode_frames
+from logic.training import StageTimer, hash_inputs, is_up_to_date, read_inputs, write_manifest
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "data")
+MODEL_DIR = os.path.join(BASE_DIR, "models")
 
-all_files = [f for f in os.listdir(DATA_DIR) if f.endswith(".csv")]
-df_list = []
 
-for file in all_files:
-    team_df = pd.read_csv(os.path.join(DATA_DIR, file))
-    team_name = os.path.splitext(file)[0]
-    team_df["Team"] = team_name
-    df_list.append(team_df)
+def train_strength_model(n_jobs=None, n_estimators=200, force=False, max_workers=None):
+    """Train the playing-XI strength model and publish it as a new version.
 
-df = pd.concat(df_list, ignore_index=True)
+    Team CSVs are hashed and read in parallel. Returns a JSON-serializable
+    report; accuracy is the forest's out-of-bag score, so the model is still
+    fit on every row. Skips training when every input hash and the
+    parameters match the published version, unless `force` is set.
+    """
+    timer = StageTimer()
+    params = {"n_estimators": n_estimators, "random_state": 42, "features": "sparse-presence"}
 
-# -----------------------------
-# 2. Features & label
-# -----------------------------
-feature_columns = [col for col in df.columns if col.lower() not in ["result", "team"]]
+    # -----------------------------
+    # 1. Load CSVs
+    # -----------------------------
+    all_files = sorted(f for f in os.listdir(DATA_DIR) if f.endswith(".csv"))
+    paths = [os.path.join(DATA_DIR, f) for f in all_files]
+    inputs = hash_inputs(paths, max_workers)
+    timer.lap("hash")
 
-X = df[feature_columns].copy()
-y = df["Result"]
+    if not force and is_up_to_date(MODEL_DIR, inputs, params):
+        return {"model": "strength", "skipped": True, "inputs": inputs, "timings": timer.report()}
 
-# -----------------------------
-# 3. Encoders
-# -----------------------------
-team_encoder = LabelEncoder()
-team_enc = team_encoder.fit_transform(df["Team"])
-X["Team_enc"] = team_enc
+    frames = read_inputs(paths, max_workers)
+    timer.lap("ingest")
 
-# ADD TO FEATURE LIST
-feature_columns.append("Team_enc")
+    # -----------------------------
+    # 2. Encoders
+    # -----------------------------
+    team_names = [os.path.splitext(f)[0] for f in all_files]
+    team_encoder = LabelEncoder()
+    team_codes = team_encoder.fit_transform(team_names)
 
-# Encode result
-result_encoder = LabelEncoder()
-y_encoded = result_encoder.fit_transform(y)
+    # -----------------------------
+    # 3. Sparse features & label
+    # -----------------------------
+    # CSR player-presence matrix; Team_enc is the last column. Players absent
+    # from a team's CSV are 0, exactly as at inference time.
+    X, feature_columns, y = encode_frames(frames, team_codes)
 
-# -----------------------------
-# 4. Train model
-# -----------------------------
-model = RandomForestClassifier(n_estimators=200, random_state=42)
-model.fit(X, y_encoded)
+    # Encode result
+    result_encoder = LabelEncoder()
+    y_encoded = result_encoder.fit_transform(y)
+    timer.lap("prepare")
 
-# -----------------------------
-# 5. SAVE EVERYTHING
-# -----------------------------
-MODEL_DIR = os.path.join(BASE_DIR, "models")
-os.makedirs(MODEL_DIR, exist_ok=True)
+    # -----------------------------
+    # 4. Train model
+    # -----------------------------
+    model = RandomForestClassifier(n_estimators=n_estimators, random_state=42, n_jobs=n_jobs, oob_score=True)
+    model.fit(X, y_encoded)
+    timer.lap("train")
+
+    accuracy = float(model.oob_score_)
+
+    # -----------------------------
+    # 5. SAVE EVERYTHING
+    # -----------------------------
+    # Each run goes into its own version directory; publishing it makes the
+    # running API hot-swap to it (see logic/model_registry.py).
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    version, version_dir = create_version_dir(MODEL_DIR)
+
+    joblib.dump(model, os.path.join(version_dir, "strength_model.pkl"))
+    joblib.dump(team_encoder, os.path.join(version_dir, "team_encoder.pkl"))
+    joblib.dump(result_encoder, os.path.join(version_dir, "result_encoder.pkl"))
+
+    # THIS IS THE FILE PREDICT.PY USES
+    joblib.dump(feature_columns, os.path.join(version_dir, "model_columns.pkl"))
+    write_manifest(version_dir, {"inputs": inputs, "params": params, "accuracy": accuracy})
+    publish_version(MODEL_DIR, version)
+    timer.lap("save")
 
-joblib.dump(model, os.path.join(MODEL_DIR, "strength_model.pkl"))
-joblib.dump(team_encoder, os.path.join(MODEL_DIR, "team_encoder.pkl"))
-joblib.dump(result_encoder, os.path.join(MODEL_DIR, "result_encoder.pkl"))
+    return {
+        "model": "strength",
+        "skipped": False,
+        "version": version,
+        "rows": int(X.shape[0]),
+        "features": len(feature_columns),
+        "accuracy": round(accuracy, 4),
+        "inputs": inputs,
+        "timings": timer.report(),
+    }
 
-# THIS IS THE FILE PREDICT.PY USES
-joblib.dump(feature_columns, os.path.join(MODEL_DIR, "model_columns.pkl"))
 
-print("Training complete! Saved model_columns:", feature_columns)
+if __name__ == "__main__":
+    print(json.dumps(train_strength_model()))
@@ -0,0 +1,60 @@
+"""Training CLI for the history and player-strength models.
+
+Run from football-backend/:
+
+    python -m logic.train                  # both models
+    python -m logic.train strength --n-jobs -1
+    python -m logic.train history --force
+
+Prints one JSON object with a report per model (timings, accuracy, version
+or `"skipped": true` when the inputs are unchanged). Newly trained versions
+are published for the running API to hot-swap.
+"""
+
+import argparse
+import json
+import sys
+
+MODELS = ("history", "strength")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m logic.train", description=__doc__.splitlines()[0])
+    parser.add_argument("models", nargs="*", metavar="{history,strength}", help="models to train (default: all)")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="tree-building processes (-1 = all cores)")
+    parser.add_argument("--n-estimators", type=int, default=200)
+    parser.add_argument("--io-workers", type=int, default=None, help="threads for CSV reading/hashing")
+    parser.add_argument("--force", action="store_true", help="retrain even if inputs are unchanged")
+    args = parser.parse_args(argv)
+    unknown = set(args.models) - set(MODELS)
+    if unknown:
+        parser.error(f"unknown model(s): {', '.join(sorted(unknown))}")
+
+    from logic.history_predictor.train import train_history_model
+    from logic.player_strength.train import train_strength_model
+
+    reports = []
+    failed = False
+    for name in args.models or MODELS:
+        try:
+            if name == "history":
+                report = train_history_model(n_jobs=args.n_jobs, n_estimators=args.n_estimators, force=args.force)
+            else:
+                report = train_strength_model(
+                    n_jobs=args.n_jobs,
+                    n_estimators=args.n_estimators,
+                    force=args.force,
+                    max_workers=args.io_workers,
+                )
+        except Exception as e:
+            failed = True
+            report = {"model": name, "error": str(e)}
+        reports.append(report)
+
+    json.dump({"reports": reports}, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
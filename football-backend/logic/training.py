@@ -0,0 +1,79 @@
+"""Shared helpers for the training scripts.
+
+Inputs are hashed, and then read, on a thread pool (hashlib and pandas' C
+parser both release the GIL). Each published model version carries a
+`manifest.json` with the SHA-256 of every input file plus the training
+parameters, so a run whose inputs and parameters match the currently
+published version can be skipped. Hashing comes first, so a skipped run
+never parses the CSVs.
+"""
+
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from logic.model_registry import resolve_model_dir
+
+MANIFEST_FILE = "manifest.json"
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_inputs(paths: list[str], max_workers: int | None = None) -> dict[str, str]:
+    """SHA-256 of each file in parallel, keyed by the file's basename."""
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        hashes = list(pool.map(file_sha256, paths))
+    return {os.path.basename(p): h for p, h in zip(paths, hashes)}
+
+
+def read_inputs(paths: list[str], max_workers: int | None = None) -> list[pd.DataFrame]:
+    """Read CSVs in parallel; frames follow `paths` order."""
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(pd.read_csv, paths))
+
+
+def published_manifest(model_dir: str) -> dict | None:
+    """Manifest of the version currently published under `model_dir`."""
+    _, path = resolve_model_dir(model_dir)
+    try:
+        with open(os.path.join(path, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_up_to_date(model_dir: str, inputs: dict[str, str], params: dict) -> bool:
+    manifest = published_manifest(model_dir)
+    return bool(manifest) and manifest.get("inputs") == inputs and manifest.get("params") == params
+
+
+def write_manifest(version_dir: str, manifest: dict) -> None:
+    with open(os.path.join(version_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+class StageTimer:
+    """Collects wall-clock seconds per named stage for the JSON report."""
+
+    def __init__(self):
+        self.timings: dict[str, float] = {}
+        self._started = time.perf_counter()
+        self._last = self._started
+
+    def lap(self, stage: str) -> None:
+        now = time.perf_counter()
+        self.timings[stage] = round(now - self._last, 4)
+        self._last = now
+
+    def report(self) -> dict[str, float]:
+        return {**self.timings, "total": round(time.perf_counter() - self._started, 4)}
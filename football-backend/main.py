@@ -1,17 +1,35 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Depends, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
 from typing import Any, Optional
 
+import hashlib
+import json
 import os
 import time
-import urllib.request
 import urllib.parse
-import json
 import xml.etree.ElementTree as ET
 
-from logic.combined_predictor.predict import combine_predictions
+from logic.combined_predictor.predict import FormationGridTooLarge, combine_predictions_batch, recommend_formations
+from logic.combined_predictor.cache import cached_combine_predictions, prediction_cache
+from logic.formation_strength.predict import get_formation_strength
+from logic.history_predictor.predict import head_to_head
+from logic.lineup_optimizer.optimize import optimize_lineup, versus_opponent
+from logic.match_simulator.season import build_league
+from logic.match_simulator.simulate import simulate_match
+from logic.model_registry import registry as model_registry
 from auth.routes import router as auth_router
+from auth.hashing import password_hasher
+from auth.security import get_current_user, get_optional_user, require_admin
+from chat.engines import get_engine, keyword_reply, sse_events
+from chat.kb import chat_kb
+from database.reference_cache import bump_reference_version, reference_cache
+from services import metrics
+from services.cache import SWRCache
+from services.simulations import SimulationsBusy, season_simulator
+from services.upstream import UpstreamError, upstream
 
 
 app = FastAPI()
@@ -19,29 +37,146 @@ app = FastAPI()
 
 @app.on_event("startup")
 def _ensure_db_schema():
-    """Lightweight schema guard for local development (no migrations).
-
-    1) Creates missing tables.
-    2) Adds any newer columns used by the app.
-    """
+    """Create missing tables and apply pending migrations (database/migrations.py)."""
     try:
-        from sqlalchemy import text
         from database.db import engine
-        from database.models import Base
+        from database.migrations import migrate
 
-        # Create any missing tables first (prevents UndefinedTable errors).
-        Base.metadata.create_all(bind=engine)
-
-        # Postgres supports IF NOT EXISTS
-        with engine.connect() as conn:
-            conn.execute(text("ALTER TABLE analyses ADD COLUMN IF NOT EXISTS name VARCHAR"))
-            conn.commit()
+        migrate(engine)
     except Exception:
         # If the DB isn't reachable at startup, normal routes will fail anyway.
         # Don't crash the app here; surface errors on request.
         pass
 
 
+@app.on_event("startup")
+def _load_chat_kb():
+    chat_kb.current()
+
+
+@app.on_event("startup")
+def _warm_models():
+    # Unpickling/compiling the forests runs off the event loop; requests that
+    # arrive first simply wait for the same load (see /health/ready).
+    model_registry.start_warm_up()
+    # Pick up versions published by the training scripts without a restart.
+    model_registry.start_watcher(float(os.getenv("MODEL_WATCH_INTERVAL", "10")))
+
+
+@app.on_event("startup")
+def _check_async_db_driver():
+    # Unlike the DB itself, a missing driver never recovers: fail loudly now.
+    from database.db import get_async_engine
+
+    get_async_engine()
+
+
+@app.on_event("startup")
+async def _load_reference_data():
+    # Official teams/players/club data are served from memory after this.
+    try:
+        await reference_cache.refresh(force=True)
+    except Exception:
+        # DB unreachable: reads fall back to the DB until a later check loads it.
+        pass
+
+
+@app.on_event("startup")
+async def _start_upstream_client():
+    await upstream.start()
+
+
+@app.on_event("shutdown")
+async def _close_upstream_client():
+    await upstream.aclose()
+
+
+@app.on_event("startup")
+def _start_password_hasher():
+    password_hasher.start()
+
+
+@app.on_event("shutdown")
+def _stop_password_hasher():
+    password_hasher.shutdown()
+
+
+@app.on_event("shutdown")
+def _stop_season_simulator():
+    season_simulator.shutdown()
+
+
+@app.on_event("shutdown")
+async def _close_async_db():
+    from database.db import dispose_async_engine
+
+    await dispose_async_engine()
+
+
+def _cache_lookups():
+    yield ("prediction", "hit"), prediction_cache.hits
+    yield ("prediction", "miss"), prediction_cache.misses
+    yield ("prediction", "bypass"), prediction_cache.bypasses
+    yield ("reference", "hit"), reference_cache.hits
+    yield ("reference", "miss"), reference_cache.misses
+    for name, cache in (("news", _NEWS_CACHE), ("standings", _STANDINGS_CACHE)):
+        yield (name, "hit"), cache.hits
+        yield (name, "stale"), cache.stale_hits
+        yield (name, "miss"), cache.misses
+
+
+def _cache_hit_ratios():
+    totals: dict[str, list[float]] = {}
+    for (name, result), count in _cache_lookups():
+        hits_total = totals.setdefault(name, [0, 0])
+        hits_total[1] += count
+        if result in ("hit", "stale"):
+            hits_total[0] += count
+    for name, (hits, total) in totals.items():
+        yield (name,), (hits / total) if total else None
+
+
+def _password_hashing():
+    stats = password_hasher.stats()
+    for key in ("in_flight", "queue_depth", "workers"):
+        yield (key,), stats[key]
+
+
+metrics.callback("cache_lookups_total", "Cache lookups by result", "counter", ("cache", "result"), _cache_lookups)
+metrics.callback("cache_hit_ratio", "Share of lookups served from cache (stale included)", "gauge", ("cache",), _cache_hit_ratios)
+metrics.callback("password_hashing", "Password hashing pool state", "gauge", ("state",), _password_hashing)
+metrics.callback(
+    "password_hashing_rejected_total", "Password hashing calls rejected (queue full)", "counter", (),
+    lambda: [((), password_hasher.rejected)],
+)
+metrics.callback(
+    "season_simulations_running", "Season simulation jobs in progress", "gauge", (),
+    lambda: [((), season_simulator.running)],
+)
+metrics.callback("models_ready", "1 when the prediction models are loaded", "gauge", (), lambda: [((), int(model_registry.ready))])
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus scrape endpoint (text exposition format)."""
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/health/ready")
+def health_ready():
+    status = model_registry.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+
+@app.post("/admin/models/reload", status_code=202)
+def reload_models(current_user: str = Depends(require_admin)):
+    """Load the currently published model versions in the background and swap them in."""
+    started = model_registry.reload()
+    return {"started": started, **model_registry.status()}
+
+
+app.add_middleware(metrics.MetricsMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -67,88 +202,49 @@ class Match(BaseModel):
     right_rating: float
 
 
-class ChatRequest(BaseModel):
-    message: str
-
+# Upper bound on fixtures per /predict/batch call (one full round-robin of
+# ~30 teams fits comfortably). Anonymous callers get a smaller batch, about
+# 50 ms of model time.
+_MAX_PREDICT_BATCH = 1000
+_MAX_ANONYMOUS_PREDICT_BATCH = 100
 
-_CHAT_KB_CACHE: dict[str, Any] = {"ts": 0.0, "path": None, "data": None}
 
+class MatchBatch(BaseModel):
+    # Items are validated one by one in predict_batch, so a malformed fixture
+    # only fails its own slot; the length is checked before any of them.
+    matches: list[dict[str, Any]] = Field(..., max_length=_MAX_PREDICT_BATCH)
 
-def _load_chat_kb() -> dict[str, Any]:
-    """Load canned chat responses from JSON.
 
-    Format:
-      {
-        "default": "...",
-        "intents": [
-          {"any": ["kw1", "kw2"], "reply": "..."},
-          {"all": ["kw1", "kw2"], "reply": "..."}
-        ]
-      }
-    """
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    kb_path = os.getenv("CHAT_KB_PATH") or os.path.join(base_dir, "chat_knowledge.json")
+def _validation_message(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(x) for x in err['loc'])}: {err['msg']}" for err in e.errors())
 
-    now = time.time()
-    cached = _CHAT_KB_CACHE
-    if cached.get("data") is not None and cached.get("path") == kb_path and (now - float(cached.get("ts") or 0)) < 5:
-        return cached["data"]
 
-    try:
-        with open(kb_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        if not isinstance(data, dict):
-            raise ValueError("chat KB must be a JSON object")
-        if "intents" in data and not isinstance(data.get("intents"), list):
-            raise ValueError("chat KB intents must be a list")
-    except Exception:
-        data = {}
-
-    _CHAT_KB_CACHE["ts"] = now
-    _CHAT_KB_CACHE["path"] = kb_path
-    _CHAT_KB_CACHE["data"] = data
-    return data
-
-
-def _chat_reply(message: str) -> str:
-    text = (message or "").strip().lower()
-    if not text:
-        return "Ask a question about football or how to use the app."
-
-    kb = _load_chat_kb()
-    intents = kb.get("intents") if isinstance(kb, dict) else None
-    if isinstance(intents, list):
-        for intent in intents:
-            if not isinstance(intent, dict):
-                continue
-
-            any_keywords = intent.get("any")
-            all_keywords = intent.get("all")
-
-            matched = False
-            if isinstance(any_keywords, list) and any_keywords:
-                matched = any((str(k).lower() in text) for k in any_keywords)
-            elif isinstance(all_keywords, list) and all_keywords:
-                matched = all((str(k).lower() in text) for k in all_keywords)
-
-            if matched:
-                reply = intent.get("reply")
-                if isinstance(reply, str) and reply.strip():
-                    return reply.strip()
-
-    default_reply = kb.get("default") if isinstance(kb, dict) else None
-    if isinstance(default_reply, str) and default_reply.strip():
-        return default_reply.strip()
-
-    return (
-        "I can help with football basics (formations, pressing, counters) or how to use this app (Team Selector, Build Team, Build Match). "
-        "Try asking: 'How do I predict a match?' or 'Which formation fits a counter-attacking team?'"
-    )
+class ChatRequest(BaseModel):
+    message: str
 
 
 @app.post("/chat")
 def chat_endpoint(payload: ChatRequest):
-    return {"reply": _chat_reply(payload.message)}
+    return {"reply": keyword_reply(payload.message)}
+
+
+class ChatStreamRequest(ChatRequest):
+    engine: Optional[str] = None
+
+
+@app.post("/chat/stream")
+async def chat_stream(payload: ChatStreamRequest):
+    """Stream the answer as Server-Sent Events (`data: {"token": ...}` frames,
+    then `event: done`)."""
+    engine = get_engine(payload.engine)
+    if engine is None:
+        raise HTTPException(status_code=400, detail=f"Unknown chat engine: {payload.engine}")
+
+    return StreamingResponse(
+        sse_events(engine, payload.message),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 
@@ -157,7 +253,7 @@ def chat_endpoint(payload: ChatRequest):
 @app.post("/predict")
 def predict(match: Match):
     try:
-        result = combine_predictions(
+        result, probabilities = cached_combine_predictions(
             match.team_a,
             match.team_b,
             match.left_formation,      # 👈 pass through
@@ -165,14 +261,136 @@ def predict(match: Match):
             match.left_playing_11,
             match.right_playing_11,
             match.left_rating,
-            match.right_rating
+            match.right_rating,
+        )
+    except Exception as e:
+        return {"error": str(e)}
+
+    return {"winner": result, "probabilities": probabilities}
+
+
+class FormationRecommendationRequest(BaseModel):
+    team_a: str
+    team_b: str
+    opponent_formation: Optional[str] = None
+    left_playing_11: Optional[dict] = None
+    right_playing_11: Optional[dict] = None
+    left_rating: float = 0.0
+    right_rating: float = 0.0
+
+
+# Formation pairings one anonymous /recommend-formation call may rank;
+# logged-in users are bounded only by the formation table.
+_MAX_ANONYMOUS_FORMATION_PAIRINGS = 64
+
+
+@app.post("/recommend-formation")
+def recommend_formation(payload: FormationRecommendationRequest, current_user: Optional[str] = Depends(get_optional_user)):
+    """Rank team_a's formations against team_b through the combined predictor."""
+    try:
+        return recommend_formations(
+            payload.team_a,
+            payload.team_b,
+            payload.left_playing_11,
+            payload.right_playing_11,
+            payload.left_rating,
+            payload.right_rating,
+            opponent_formation=payload.opponent_formation,
+            max_pairings=None if current_user else _MAX_ANONYMOUS_FORMATION_PAIRINGS,
+        )
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except FormationGridTooLarge as e:
+        raise HTTPException(status_code=401, detail=f"Log in to rank {e}", headers={"WWW-Authenticate": "Bearer"})
+    except Exception as e:
+        return {"error": str(e)}
+
+
+@app.get("/head-to-head/{team_a}/{team_b}")
+def head_to_head_stats(team_a: str, team_b: str):
+    try:
+        result = head_to_head(team_a, team_b)
+    except Exception as e:
+        return {"error": str(e)}
+    if result is None:
+        raise HTTPException(status_code=404, detail="Unknown team for the history model")
+    return result
+
+
+@app.get("/predict/cache/stats")
+def predict_cache_stats():
+    return prediction_cache.stats()
+
+
+@app.post("/predict/batch")
+def predict_batch(batch: MatchBatch, current_user: Optional[str] = Depends(get_optional_user)):
+    if current_user is None and len(batch.matches) > _MAX_ANONYMOUS_PREDICT_BATCH:
+        raise HTTPException(
+            status_code=401,
+            detail=f"Log in to predict more than {_MAX_ANONYMOUS_PREDICT_BATCH} matches per batch",
+            headers={"WWW-Authenticate": "Bearer"},
         )
+
+    results: list[Optional[dict[str, Any]]] = [None] * len(batch.matches)
+    valid = []
+    for i, item in enumerate(batch.matches):
+        try:
+            valid.append((i, Match.model_validate(item).model_dump()))
+        except ValidationError as e:
+            results[i] = {"error": _validation_message(e)}
+
+    try:
+        scored = combine_predictions_batch([m for _, m in valid])
     except Exception as e:
         return {"error": str(e)}
 
-    return {"winner": result}
+    for (i, _), result in zip(valid, scored):
+        results[i] = result
+    return {"results": results}
+
+
+# Upper bound on simulated matches per /simulate call. The endpoint is open
+# to anonymous callers, so one call stays in the tens of milliseconds.
+_MAX_SIMULATIONS = 100_000
+
+
+class SimulationRequest(Match):
+    iterations: int = 100_000
+    seed: Optional[int] = None
+
 
+@app.post("/simulate")
+def simulate(payload: SimulationRequest):
+    if not 1 <= payload.iterations <= _MAX_SIMULATIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"iterations must be between 1 and {_MAX_SIMULATIONS}",
+        )
+
+    try:
+        winner, probabilities = cached_combine_predictions(
+            payload.team_a,
+            payload.team_b,
+            payload.left_formation,
+            payload.right_formation,
+            payload.left_playing_11,
+            payload.right_playing_11,
+            payload.left_rating,
+            payload.right_rating,
+        )
+        result = simulate_match(
+            probabilities,
+            get_formation_strength(payload.team_a, payload.left_formation),
+            get_formation_strength(payload.team_b, payload.right_formation),
+            payload.left_rating,
+            payload.right_rating,
+            iterations=payload.iterations,
+            seed=payload.seed,
+        )
+    except Exception as e:
+        return {"error": str(e)}
 
+    return {"winner": winner, "model_probabilities": probabilities, **result}
 
 
 
@@ -181,18 +399,12 @@ def predict(match: Match):
 
 app.include_router(auth_router)
 
-from database.db import SessionLocal
+from database.db import get_async_db, get_db
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from fastapi import Depends
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-        
-        
-        
+
+
+from sqlalchemy import JSON, Integer, String, cast, literal, null, select, union, union_all
 from database.models import Team, CustomTeam
 from auth.security import get_current_user
 
@@ -301,6 +513,11 @@ def create_custom_team(
 
     row = CustomTeam(owner_email=current_user, name=team_name, players=normalized_players)
     db.add(row)
+    # A custom team named like an official one shadows it for this user,
+    # which the reference cache has to know about.
+    shadows_official = db.query(Team.id).filter(Team.name == team_name).first() is not None
+    if shadows_official:
+        bump_reference_version(db)
     try:
         db.commit()
         db.refresh(row)
@@ -308,60 +525,202 @@ def create_custom_team(
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
+    if shadows_official:
+        reference_cache.mark_shadowed(current_user, team_name)
     return {"message": "Custom team created", "team": row.name}
 
 
-@app.get("/teams")
-def get_teams(db: Session = Depends(get_db), current_user: str = Depends(get_current_user)):
-    teams = [t.name for t in db.query(Team).all()]
-    custom_teams = [
-        t.name
-        for t in db.query(CustomTeam)
-        .filter(CustomTeam.owner_email == current_user)
-        .all()
-    ]
+@app.post("/admin/reference-data/reload", status_code=202)
+def reload_reference_data(db: Session = Depends(get_db), current_user: str = Depends(require_admin)):
+    """Mark teams/players/club data as changed (e.g. after editing them in SQL);
+    every worker reloads its reference cache."""
+    bump_reference_version(db)
+    db.commit()
+    reference_cache.invalidate()
+    return reference_cache.stats()
 
-    merged = sorted(set(teams + custom_teams), key=lambda s: str(s).lower())
-    return {"teams": merged}
 
+def _etag_json(request: Request, body: Any) -> Response:
+    """JSON response with a content ETag; answers 304 to a matching If-None-Match."""
+    payload = json.dumps(body, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+    etag = '"' + hashlib.sha1(payload).hexdigest() + '"'
+    # Browsers may reuse the body but must revalidate it every time.
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
 
-@app.get("/logo/{team_name}")
-def get_logo(team_name: str, db: Session = Depends(get_db), current_user: str = Depends(get_current_user)):
-    # Custom teams don't have official logos
-    custom = (
-        db.query(CustomTeam)
-        .filter(CustomTeam.owner_email == current_user, CustomTeam.name == team_name)
-        .first()
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        if etag in tags or "*" in tags:
+            return Response(status_code=304, headers=headers)
+    return Response(content=payload, media_type="application/json", headers=headers)
+
+
+# Official team data is served from the reference cache
+# (database/reference_cache.py). The DB is used for custom teams, and as a
+# fallback until the cache has loaded. Those reads are one round trip each:
+# the user's custom teams and the official tables are combined with
+# UNION (ALL) and only the needed columns are selected. A source column
+# (0 = custom, 1 = official) lets custom teams shadow official ones with the
+# same name, as before.
+
+@app.get("/teams")
+async def get_teams(request: Request, db: AsyncSession = Depends(get_async_db), current_user: str = Depends(get_current_user)):
+    snapshot = reference_cache.current()
+    if snapshot is not None:
+        custom = (
+            await db.execute(select(CustomTeam.name).where(CustomTeam.owner_email == current_user))
+        ).scalars()
+        merged = sorted(set(snapshot.teams).union(custom), key=lambda s: str(s).lower())
+        return _etag_json(request, {"teams": merged})
+
+    names = union(
+        select(Team.name),
+        select(CustomTeam.name).where(CustomTeam.owner_email == current_user),
     )
-    if custom:
-        return {"team": team_name, "logo": None}
+    merged = sorted((await db.execute(names)).scalars(), key=lambda s: str(s).lower())
+    return _etag_json(request, {"teams": merged})
+
 
-    team = db.query(Team).filter(Team.name == team_name).first()
-    return {"team": team_name, "logo": team.logo if team else None}
+@app.get("/logo/{team_name}")
+async def get_logo(request: Request, team_name: str, db: AsyncSession = Depends(get_async_db), current_user: str = Depends(get_current_user)):
+    snapshot = reference_cache.current_for(team_name)
+    if snapshot is not None:
+        # Custom (or unknown) teams have no official logo.
+        logo = snapshot.logos.get(team_name) if snapshot.is_official(team_name, current_user) else None
+        return _etag_json(request, {"team": team_name, "logo": logo})
+
+    # Custom teams don't have official logos
+    rows = (await db.execute(
+        union_all(
+            select(literal(0).label("source"), cast(null(), String).label("logo")).where(
+                CustomTeam.owner_email == current_user, CustomTeam.name == team_name
+            ),
+            select(literal(1).label("source"), Team.logo).where(Team.name == team_name),
+        )
+        .order_by("source")
+        .limit(1)
+    )).first()
+    return _etag_json(request, {"team": team_name, "logo": rows.logo if rows else None})
 
 from database.models import Player
 
+async def _load_squad(db: AsyncSession, team_name: str, current_user: str) -> Optional[list[dict[str, Any]]]:
+    """The user's custom squad of that name, else the official players.
+
+    Returns None when neither exists.
+    """
+    snapshot = reference_cache.current_for(team_name)
+    if snapshot is not None and snapshot.is_official(team_name, current_user):
+        return snapshot.players.get(team_name, [])
+
+    rows = (await db.execute(
+        union_all(
+            select(
+                literal(0).label("source"),
+                CustomTeam.players.label("squad"),
+                cast(null(), String).label("name"),
+                cast(null(), String).label("position"),
+                cast(null(), Integer).label("rating"),
+            ).where(CustomTeam.owner_email == current_user, CustomTeam.name == team_name),
+            select(
+                literal(1).label("source"),
+                cast(null(), JSON).label("squad"),
+                Player.name,
+                Player.position,
+                Player.rating,
+            ).where(Player.team == team_name),
+        )
+    )).all()
+
+    for r in rows:
+        if r.source == 0:
+            return r.squad if isinstance(r.squad, list) else []
+
+    if not rows:
+        return None
+    return [
+        {
+            "name": p.name,
+            "position": p.position,
+            "rating": p.rating
+        } for p in rows
+    ]
+
+
 @app.get("/players/{team_name}")
-def get_players(team_name: str, db: Session = Depends(get_db), current_user: str = Depends(get_current_user)):
-    custom = (
-        db.query(CustomTeam)
-        .filter(CustomTeam.owner_email == current_user, CustomTeam.name == team_name)
-        .first()
-    )
-    if custom:
-        players = custom.players if isinstance(custom.players, list) else []
-        return {"team": team_name, "players": players}
+async def get_players(request: Request, team_name: str, db: AsyncSession = Depends(get_async_db), current_user: str = Depends(get_current_user)):
+    players = await _load_squad(db, team_name, current_user)
+    return _etag_json(request, {"team": team_name, "players": players or []})
 
-    players = db.query(Player).filter(Player.team == team_name).all()
-    return {
-        "team": team_name,
-        "players": [
-            {
-                "name": p.name,
-                "position": p.position,
-                "rating": p.rating
-            } for p in players
+
+class OptimizeLineupRequest(BaseModel):
+    team: str
+    formation: str
+    opponent: Optional[str] = None
+    opponent_formation: Optional[str] = None
+    top_k: int = 5
+    beam_width: int = 64
+
+
+# Bounds for /optimize-lineup (keep one search well under a second).
+_MAX_LINEUP_TOP_K = 20
+_MAX_LINEUP_BEAM = 512
+
+
+@app.post("/optimize-lineup")
+async def optimize_lineup_endpoint(
+    payload: OptimizeLineupRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: str = Depends(get_current_user),
+):
+    """Best XIs for a formation, ranked by strength-model probability and rating."""
+    if not 1 <= payload.top_k <= _MAX_LINEUP_TOP_K:
+        raise HTTPException(status_code=400, detail=f"top_k must be between 1 and {_MAX_LINEUP_TOP_K}")
+    if not 1 <= payload.beam_width <= _MAX_LINEUP_BEAM:
+        raise HTTPException(status_code=400, detail=f"beam_width must be between 1 and {_MAX_LINEUP_BEAM}")
+
+    squads = {}
+    for name in filter(None, (payload.team, payload.opponent)):
+        squad = await _load_squad(db, name, current_user)
+        if squad is None:
+            raise HTTPException(status_code=404, detail=f"Team not found: {name}")
+        squads[name] = [
+            {"name": p.get("name"), "position": _normalize_position(p.get("position")), "rating": p.get("rating")}
+            for p in squad
         ]
+
+    def _search():
+        models = model_registry.get()
+        results = optimize_lineup(
+            models, squads[payload.team], payload.formation, top_k=payload.top_k, beam_width=payload.beam_width
+        )
+        if payload.opponent:
+            opponent_formation = payload.opponent_formation or payload.formation
+            opponent_xi = optimize_lineup(
+                models, squads[payload.opponent], opponent_formation, top_k=1, beam_width=payload.beam_width
+            )[0]
+            versus_opponent(
+                models, payload.team, payload.formation, results,
+                payload.opponent, opponent_formation, opponent_xi,
+            )
+            return results, opponent_xi
+        return results, None
+
+    try:
+        # Forest evaluation is CPU work; keep it off the event loop.
+        results, opponent_xi = await run_in_threadpool(_search)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "team": payload.team,
+        "formation": payload.formation,
+        "lineups": results,
+        "opponent": (
+            {"team": payload.opponent, "formation": payload.opponent_formation or payload.formation, "lineup": opponent_xi}
+            if opponent_xi is not None
+            else None
+        ),
     }
 
 
@@ -387,8 +746,12 @@ def _normalize_team_key(team_name: str) -> str:
     return "".join(ch for ch in (team_name or "").strip().lower() if ch.isalnum())
 
 
+# Overridable so the integrations can be pointed at a local stub server.
+_FOOTBALL_DATA_API_BASE = os.getenv("FOOTBALL_DATA_API_BASE", "https://api.football-data.org/v4")
+
+
 @app.get("/schedule/{team_name}")
-def get_schedule(team_name: str, current_user: str = Depends(get_current_user)):
+async def get_schedule(team_name: str, current_user: str = Depends(get_current_user)):
     token = os.getenv("FOOTBALL_DATA_TOKEN")
     if not token:
         raise HTTPException(
@@ -401,23 +764,14 @@ def get_schedule(team_name: str, current_user: str = Depends(get_current_user)):
     if not team_id:
         raise HTTPException(status_code=404, detail="Team not supported for schedules")
 
-    base_url = "https://api.football-data.org/v4"
     params = urllib.parse.urlencode({"status": "SCHEDULED", "limit": 10})
-    url = f"{base_url}/teams/{team_id}/matches?{params}"
+    url = f"{_FOOTBALL_DATA_API_BASE}/teams/{team_id}/matches?{params}"
 
-    req = urllib.request.Request(url, headers={"X-Auth-Token": token})
     try:
-        with urllib.request.urlopen(req, timeout=10) as resp:
-            payload = json.loads(resp.read().decode("utf-8"))
-    except urllib.error.HTTPError as e:
+        payload = await upstream.get_json(url, headers={"X-Auth-Token": token}, timeout=10)
+    except UpstreamError as e:
         # Bubble up API errors in a user-friendly way.
-        try:
-            detail = e.read().decode("utf-8")
-        except Exception:
-            detail = str(e)
-        raise HTTPException(status_code=502, detail=f"Schedule provider error: {detail}")
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"Schedule provider error: {str(e)}")
+        raise HTTPException(status_code=502, detail=f"Schedule provider error: {e.detail}")
 
     matches = payload.get("matches") if isinstance(payload, dict) else None
     if not isinstance(matches, list):
@@ -465,19 +819,29 @@ def get_schedule(team_name: str, current_user: str = Depends(get_current_user)):
 from database.models import ClubMetric
 
 @app.get("/club-metrics/{team_name}")
-def get_metrics(team_name: str, db: Session = Depends(get_db), current_user: str = Depends(get_current_user)):
-    row = db.query(ClubMetric).filter(ClubMetric.team == team_name).first()
-    return {"team": team_name, "metrics": row.metrics if row else []}
+async def get_metrics(request: Request, team_name: str, db: AsyncSession = Depends(get_async_db), current_user: str = Depends(get_current_user)):
+    snapshot = reference_cache.current()
+    if snapshot is not None:
+        metrics = snapshot.metrics.get(team_name)
+    else:
+        metrics = (
+            await db.execute(select(ClubMetric.metrics).where(ClubMetric.team == team_name).limit(1))
+        ).scalar_one_or_none()
+    return _etag_json(request, {"team": team_name, "metrics": metrics if metrics is not None else []})
 
 
 from database.models import ClubHistory
 
 @app.get("/club-history/{team_name}")
-def get_club_history(team_name: str, db: Session = Depends(get_db), current_user: str = Depends(get_current_user)):
-    row = db.query(ClubHistory).filter(
-        ClubHistory.team == team_name.lower()
-    ).first()
-    return {"history": row.history if row else []}
+async def get_club_history(request: Request, team_name: str, db: AsyncSession = Depends(get_async_db), current_user: str = Depends(get_current_user)):
+    snapshot = reference_cache.current()
+    if snapshot is not None:
+        history = snapshot.history.get(team_name.lower())
+    else:
+        history = (
+            await db.execute(select(ClubHistory.history).where(ClubHistory.team == team_name.lower()).limit(1))
+        ).scalar_one_or_none()
+    return _etag_json(request, {"history": history if history is not None else []})
 
 
 # ----------------------------
@@ -548,16 +912,18 @@ def save_analysis(
 
 
 @app.get("/analysis")
-def list_analyses(
-    db: Session = Depends(get_db),
+async def list_analyses(
+    db: AsyncSession = Depends(get_async_db),
     current_user: str = Depends(get_current_user),
 ):
+    # Only the listed columns: the saved pitch state stays in the table.
     rows = (
-        db.query(Analysis)
-        .filter(Analysis.user_email == current_user)
-        .order_by(Analysis.created_at.desc())
-        .all()
-    )
+        await db.execute(
+            select(Analysis.id, Analysis.name, Analysis.created_at, Analysis.team, Analysis.formation)
+            .where(Analysis.user_email == current_user)
+            .order_by(Analysis.created_at.desc())
+        )
+    ).all()
     return {
         "analyses": [
             {
@@ -603,25 +969,25 @@ def get_analysis(
 # Latest news (RSS headlines)
 # ----------------------------
 
-_NEWS_CACHE: dict[str, Any] = {"ts": 0.0, "data": None}
+# Stale-while-revalidate: fresh for the TTL, then served stale while one
+# background refresh runs (and as a fallback if the upstream is failing).
+_NEWS_CACHE = SWRCache(ttl=300, max_stale=3600)
 
 _LEAGUES_CACHE: dict[str, Any] = {"ts": 0.0, "data": None}
-_STANDINGS_CACHE: dict[str, Any] = {}
+# League ids come from the URL, so keep the standings cache bounded.
+_STANDINGS_CACHE = SWRCache(ttl=600, max_stale=6 * 3600, maxsize=64)
+
+# The feed is fetched once at this size and sliced per request.
+_NEWS_MAX_ITEMS = 50
 
 
-def _fetch_rss_headlines(url: str, limit: int = 20) -> list[dict[str, Any]]:
-    req = urllib.request.Request(
+async def _fetch_rss_headlines(url: str, limit: int = 20) -> list[dict[str, Any]]:
+    xml_bytes = await upstream.get_bytes(
         url,
-        headers={
-            "User-Agent": "One-Football/1.0 (+https://localhost)",
-            "Accept": "application/rss+xml, application/xml;q=0.9, */*;q=0.8",
-        },
-        method="GET",
+        headers={"Accept": "application/rss+xml, application/xml;q=0.9, */*;q=0.8"},
+        timeout=6,
     )
 
-    with urllib.request.urlopen(req, timeout=6) as resp:
-        xml_bytes = resp.read()
-
     root = ET.fromstring(xml_bytes)
     channel = root.find("channel")
     if channel is None:
@@ -643,46 +1009,35 @@ def _fetch_rss_headlines(url: str, limit: int = 20) -> list[dict[str, Any]]:
     return items
 
 
-def _http_get_json(url: str, timeout: int = 8) -> Any:
-    req = urllib.request.Request(
-        url,
-        headers={
-            "User-Agent": "One-Football/1.0 (+https://localhost)",
-            "Accept": "application/json",
-        },
-        method="GET",
-    )
-    with urllib.request.urlopen(req, timeout=timeout) as resp:
-        raw = resp.read().decode("utf-8", errors="replace")
-    return json.loads(raw)
+async def _http_get_json(url: str, timeout: int = 8) -> Any:
+    return await upstream.get_json(url, timeout=timeout)
+
+
+_NEWS_FEED_URL = os.getenv("NEWS_FEED_URL", "https://feeds.bbci.co.uk/sport/football/rss.xml")
 
 
 @app.get("/news/latest")
-def latest_news(
+async def latest_news(
     limit: int = 20,
     current_user: str = Depends(get_current_user),
 ):
-    # Cache for 5 minutes to avoid repeated external requests
-    now = time.time()
-    if _NEWS_CACHE.get("data") is not None and (now - float(_NEWS_CACHE.get("ts") or 0)) < 300:
-        cached = _NEWS_CACHE["data"]
-        return {
-            "source": cached.get("source"),
-            "items": cached.get("items", []),
-            "cached": True,
-        }
-
     # RSS feed (no API key). Headlines + links only.
-    feed_url = "https://feeds.bbci.co.uk/sport/football/rss.xml"
+    async def _load():
+        items = await _fetch_rss_headlines(_NEWS_FEED_URL, limit=_NEWS_MAX_ITEMS)
+        return {"source": "BBC Sport Football", "items": items}
+
     try:
-        items = _fetch_rss_headlines(feed_url, limit=limit)
+        result = await _NEWS_CACHE.get("bbc", _load)
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"News fetch failed: {e}")
 
-    data = {"source": "BBC Sport Football", "items": items}
-    _NEWS_CACHE["ts"] = now
-    _NEWS_CACHE["data"] = data
-    return {"source": data["source"], "items": data["items"], "cached": False}
+    data = result.value
+    return {
+        "source": data["source"],
+        "items": data["items"][: max(0, int(limit))],
+        "cached": result.cached,
+        "stale": result.stale,
+    }
 
 
 # ----------------------------
@@ -691,19 +1046,21 @@ def latest_news(
 
 # NOTE: Previous provider (api-football-standings.azharimm.site) is no longer
 # serving JSON. Using ESPN's public JSON endpoints instead.
-_ESPN_SOCCER_API_BASE = "https://site.web.api.espn.com/apis/v2/sports/soccer"
+_ESPN_SOCCER_API_BASE = os.getenv("ESPN_SOCCER_API_BASE", "https://site.web.api.espn.com/apis/v2/sports/soccer")
 
 # Minimal, stable league list for the dropdown.
-# IDs are ESPN soccer league codes used in URLs.
+# IDs are ESPN soccer league codes used in URLs. matchesPerTeam is the
+# regular-season length used for season projections; None marks
+# competitions whose table is not a full season (league phase + knockouts).
 _LEAGUE_CATALOG = [
-    {"id": "eng.1", "name": "Premier League", "abbr": "EPL"},
-    {"id": "esp.1", "name": "LaLiga", "abbr": "LALIGA"},
-    {"id": "ita.1", "name": "Serie A", "abbr": "SA"},
-    {"id": "ger.1", "name": "Bundesliga", "abbr": "BUN"},
-    {"id": "fra.1", "name": "Ligue 1", "abbr": "L1"},
-    {"id": "uefa.champions", "name": "UEFA Champions League", "abbr": "UCL"},
-    {"id": "uefa.europa", "name": "UEFA Europa League", "abbr": "UEL"},
-    {"id": "usa.1", "name": "MLS", "abbr": "MLS"},
+    {"id": "eng.1", "name": "Premier League", "abbr": "EPL", "matchesPerTeam": 38},
+    {"id": "esp.1", "name": "LaLiga", "abbr": "LALIGA", "matchesPerTeam": 38},
+    {"id": "ita.1", "name": "Serie A", "abbr": "SA", "matchesPerTeam": 38},
+    {"id": "ger.1", "name": "Bundesliga", "abbr": "BUN", "matchesPerTeam": 34},
+    {"id": "fra.1", "name": "Ligue 1", "abbr": "L1", "matchesPerTeam": 34},
+    {"id": "uefa.champions", "name": "UEFA Champions League", "abbr": "UCL", "matchesPerTeam": None},
+    {"id": "uefa.europa", "name": "UEFA Europa League", "abbr": "UEL", "matchesPerTeam": None},
+    {"id": "usa.1", "name": "MLS", "abbr": "MLS", "matchesPerTeam": 34},
 ]
 
 
@@ -728,8 +1085,38 @@ def list_leagues(current_user: str = Depends(get_current_user)):
     return {"leagues": _LEAGUES_CACHE["data"], "cached": True}
 
 
+async def _fetch_standings(league_id: str) -> list[dict[str, Any]]:
+    payload = await _http_get_json(_espn_standings_url(league_id))
+    children = (payload or {}).get("children") or []
+    if not children:
+        raise ValueError("No standings data")
+
+    standings = ((children[0] or {}).get("standings") or {}).get("entries") or []
+    out = []
+    for idx, entry in enumerate(standings, start=1):
+        team = (entry or {}).get("team") or {}
+        stats = (entry or {}).get("stats") or []
+        stat_map = {s.get("name"): s.get("value") for s in stats if isinstance(s, dict)}
+
+        out.append(
+            {
+                "rank": _extract_stat(stat_map, "rank", default=idx),
+                "teamId": team.get("id"),
+                "teamName": team.get("displayName") or team.get("name"),
+                "played": _extract_stat(stat_map, "gamesPlayed", "games", default=None),
+                "wins": _extract_stat(stat_map, "wins", default=None),
+                "draws": _extract_stat(stat_map, "ties", "draws", default=None),
+                "losses": _extract_stat(stat_map, "losses", default=None),
+                "goalDifference": _extract_stat(stat_map, "pointDifferential", "goalDifference", default=None),
+                "points": _extract_stat(stat_map, "points", default=None),
+            }
+        )
+
+    return [r for r in out if r.get("teamName")]
+
+
 @app.get("/leagues/{league_id}/standings")
-def league_standings(
+async def league_standings(
     league_id: str,
     season: int = int(time.gmtime().tm_year),
     current_user: str = Depends(get_current_user),
@@ -741,195 +1128,102 @@ def league_standings(
     # ESPN endpoint serves current standings without requiring a season.
     # Keep the season parameter for frontend compatibility, but do not use it.
     cache_key = f"{league_id}:current"
-    now = time.time()
-    cached = _STANDINGS_CACHE.get(cache_key)
-    if cached and (now - float(cached.get("ts") or 0)) < 600:
-        return {"leagueId": league_id, "season": season, "standings": cached.get("data", []), "cached": True}
-
     try:
-        payload = _http_get_json(_espn_standings_url(league_id))
-        children = (payload or {}).get("children") or []
-        if not children:
-            raise ValueError("No standings data")
-
-        standings = ((children[0] or {}).get("standings") or {}).get("entries") or []
-        out = []
-        for idx, entry in enumerate(standings, start=1):
-            team = (entry or {}).get("team") or {}
-            stats = (entry or {}).get("stats") or []
-            stat_map = {s.get("name"): s.get("value") for s in stats if isinstance(s, dict)}
-
-            out.append(
-                {
-                    "rank": _extract_stat(stat_map, "rank", default=idx),
-                    "teamId": team.get("id"),
-                    "teamName": team.get("displayName") or team.get("name"),
-                    "played": _extract_stat(stat_map, "gamesPlayed", "games", default=None),
-                    "wins": _extract_stat(stat_map, "wins", default=None),
-                    "draws": _extract_stat(stat_map, "ties", "draws", default=None),
-                    "losses": _extract_stat(stat_map, "losses", default=None),
-                    "goalDifference": _extract_stat(stat_map, "pointDifferential", "goalDifference", default=None),
-                    "points": _extract_stat(stat_map, "points", default=None),
-                }
-            )
+        result = await _STANDINGS_CACHE.get(cache_key, lambda: _fetch_standings(league_id))
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Standings fetch failed: {e}")
+
+    return {
+        "leagueId": league_id,
+        "season": int(season),
+        "standings": result.value,
+        "cached": result.cached,
+        "stale": result.stale,
+    }
+
+
+# Season projections run as background jobs (services/simulations.py).
+_MAX_SEASON_SIMULATIONS = 200_000
+# matches_per_team is capped at this many meetings per pair of teams (a
+# double round-robin is 2); it sets the fixture count each worker allocates for.
+_MAX_MEETINGS_PER_PAIR = 4
+
+
+class SeasonSimulationRequest(BaseModel):
+    iterations: int = 20_000
+    matches_per_team: Optional[int] = None
+    relegation_spots: int = 3
+    seed: Optional[int] = None
+
+
+@app.post("/leagues/{league_id}/simulate-season", status_code=202)
+async def simulate_season(
+    league_id: str,
+    payload: SeasonSimulationRequest,
+    current_user: str = Depends(get_current_user),
+):
+    """Start a season projection from the current standings; poll /simulations/{job_id}."""
+    league_id = (league_id or "").strip()
+    if not league_id:
+        raise HTTPException(status_code=400, detail="league_id is required")
 
-        out = [r for r in out if r.get("teamName")]
+    # Season length: the request's, else the catalog's. Leagues outside the
+    # catalog must say how long their season is.
+    catalog = next((l for l in _LEAGUE_CATALOG if l["id"] == league_id), None)
+    if catalog is not None and catalog["matchesPerTeam"] is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{catalog['name']} is not played as a league season and cannot be projected",
+        )
+    matches_per_team = payload.matches_per_team
+    if matches_per_team is None:
+        if catalog is None:
+            raise HTTPException(status_code=400, detail="matches_per_team is required for this league")
+        matches_per_team = catalog["matchesPerTeam"]
+    if not 1 <= payload.iterations <= _MAX_SEASON_SIMULATIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"iterations must be between 1 and {_MAX_SEASON_SIMULATIONS}",
+        )
+
+    try:
+        result = await _STANDINGS_CACHE.get(f"{league_id}:current", lambda: _fetch_standings(league_id))
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Standings fetch failed: {e}")
 
-    _STANDINGS_CACHE[cache_key] = {"ts": now, "data": out}
-    return {"leagueId": league_id, "season": int(season), "standings": out, "cached": False}
-
-
-
-
-
-                        
-                        
-                
-                
-                
-                
-            
-                
-        
-        
-        
-
-        
-                    
-                    
-                    
-        
-        
-        
-        
-        
-        
-        
-        
-       
-                    
-                    
-        
-        
-
-    
-
-
-
-
-
-        
-
-        
-        
-            
-            
-            
-            
-            
-            
-            
-            
-        
-        
-
-                
-                
-                
-        
-        
-        
-
-                
-                 
-        
-        
-        
-        
-        
-        
-
-
-                
-            
-            
-        
-        
-        
-        
-        
-        
-        
-
-       
-       
-                
-            
-            
-                
-                
-                
-                    
-
-                    
-        
-                    
-                    
-                    
-        
-        
-                     
-                    
-
-
-
-
-                
-            
-        
-
-                
-            
-            
-
-        
-        
-        
-        
-        
-        
-        
-        
-        
-        
-            
-            
-
-    
-       
-                
-        
-    
-        
-            
-                    
-                    
-        
-                    
-                    
-                    
-                
-                
-            
-            
-        
-        
-        
-            
-            
-        
-      
+    max_matches = _MAX_MEETINGS_PER_PAIR * max(len(result.value) - 1, 1)
+    if not 1 <= matches_per_team <= max_matches:
+        raise HTTPException(
+            status_code=400,
+            detail=f"matches_per_team must be between 1 and {max_matches} for this league",
+        )
+
+    try:
+        # The fixture pairing is a Python loop; keep it off the event loop.
+        league = await run_in_threadpool(build_league, result.value, matches_per_team)
+        job = season_simulator.submit(
+            current_user,
+            league_id,
+            league,
+            payload.iterations,
+            seed=payload.seed,
+            relegation_spots=max(0, payload.relegation_spots),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except SimulationsBusy:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many simulations running, try again shortly",
+            headers={"Retry-After": "5"},
+        )
+
+    return job.to_dict()
 
 
+@app.get("/simulations/{job_id}")
+def simulation_status(job_id: str, current_user: str = Depends(get_current_user)):
+    job = season_simulator.get(job_id, current_user)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Simulation not found")
+    return job.to_dict()
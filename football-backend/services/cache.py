@@ -0,0 +1,104 @@
+"""Async stale-while-revalidate cache for upstream-backed endpoints.
+
+- Fresh entries (younger than `ttl`) are returned as-is.
+- Stale entries (older than `ttl` but younger than `max_stale`) are returned
+  immediately while one background task refreshes them.
+- Misses are single-flight: concurrent callers for the same key await one
+  shared load instead of each hitting the upstream.
+- If a load fails and any previous value exists, that value is served
+  (marked stale) instead of an error.
+- With `maxsize`, least-recently-used keys are evicted, which bounds
+  caches whose keys come from user input.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger("services.cache")
+
+
+class CacheResult:
+    __slots__ = ("value", "cached", "stale")
+
+    def __init__(self, value: Any, cached: bool, stale: bool = False):
+        self.value = value
+        self.cached = cached
+        self.stale = stale
+
+
+class SWRCache:
+    def __init__(self, ttl: float, max_stale: float, maxsize: int | None = None):
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def _store(self, key: str, value: Any) -> None:
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        if self.maxsize is not None:
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """Start (or join) the single in-flight load for `key`."""
+        task = self._inflight.get(key)
+        if task is not None:
+            return task
+
+        async def _run():
+            try:
+                value = await loader()
+                self._store(key, value)
+                return value
+            finally:
+                self._inflight.pop(key, None)
+
+        task = asyncio.ensure_future(_run())
+        self._inflight[key] = task
+        return task
+
+    async def get(self, key: str, loader: Callable[[], Awaitable[Any]]) -> CacheResult:
+        entry = self._entries.get(key)
+        now = time.monotonic()
+
+        if entry is not None:
+            self._entries.move_to_end(key)
+            age = now - entry[0]
+            if age < self.ttl:
+                self.hits += 1
+                return CacheResult(entry[1], cached=True)
+            if age < self.ttl + self.max_stale:
+                self.stale_hits += 1
+                if key not in self._inflight:
+                    self._load(key, loader).add_done_callback(_log_refresh_failure(key))
+                return CacheResult(entry[1], cached=True, stale=True)
+
+        self.misses += 1
+        try:
+            # shield: one caller disconnecting must not cancel the shared load
+            value = await asyncio.shield(self._load(key, loader))
+        except Exception:
+            if entry is not None:
+                logger.warning("Upstream refresh failed for %s; serving stale data", key)
+                return CacheResult(entry[1], cached=True, stale=True)
+            raise
+        return CacheResult(value, cached=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _log_refresh_failure(key: str):
+    def _done(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Background refresh failed for %s: %s", key, task.exception())
+
+    return _done
@@ -0,0 +1,116 @@
+"""Prometheus metrics for the API, on top of `prometheus_client`.
+
+Metrics live in the client's default registry. Modules below the API
+(`logic`, `database`) declare their own `prometheus_client` metrics, and
+this module adds what only the app needs:
+
+- `callback()`: values read from existing stats (cache hit counts, pool
+  sizes) at scrape time, so the hot paths keep plain integer counters;
+- `MetricsMiddleware`: per-route HTTP latency and in-flight requests;
+- `render()`: the /metrics payload.
+"""
+
+import logging
+import time
+from typing import Callable, Iterable
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+logger = logging.getLogger("services.metrics")
+
+# Seconds; covers sub-millisecond cache hits up to slow upstream calls.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+_FAMILIES = {"counter": CounterMetricFamily, "gauge": GaugeMetricFamily}
+
+
+class CallbackCollector:
+    """Collector whose samples come from `fn()` at scrape time.
+
+    `fn()` yields (label values, value) pairs; None values are skipped.
+    """
+
+    def __init__(self, name: str, help: str, kind: str, labelnames: Iterable[str], fn: Callable[[], Iterable[tuple[tuple, float]]]):
+        self.name = name
+        self.help = help
+        self.family = _FAMILIES[kind]
+        self.labelnames = list(labelnames)
+        self.fn = fn
+
+    def describe(self):
+        # Lets the registry check names without calling `fn` at import time.
+        yield self.family(self.name, self.help, labels=self.labelnames)
+
+    def collect(self):
+        family = self.family(self.name, self.help, labels=self.labelnames)
+        try:
+            for values, value in self.fn():
+                if value is not None:
+                    family.add_metric([str(v) for v in values], value)
+        except Exception as e:
+            # A failing callback must not break the whole scrape.
+            logger.warning("Metric callback %s failed: %s", self.name, e)
+            return
+        yield family
+
+
+def callback(name: str, help: str, kind: str, labelnames: Iterable[str], fn) -> CallbackCollector:
+    collector = CallbackCollector(name, help, kind, labelnames, fn)
+    REGISTRY.register(collector)
+    return collector
+
+
+def render() -> bytes:
+    return generate_latest(REGISTRY)
+
+
+# ----------------------------
+# HTTP instrumentation
+# ----------------------------
+
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("method", "route", "status"),
+    buckets=DEFAULT_BUCKETS,
+)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being served")
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: latency, status and in-flight count per route.
+
+    Routes are labelled by their template (`/players/{team_name}`), never by
+    the raw path, so label cardinality stays bounded. Streaming responses
+    are timed until their last chunk.
+    """
+
+    def __init__(self, app, exclude: Iterable[str] = ("/metrics",)):
+        self.app = app
+        self.exclude = frozenset(exclude)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("path") in self.exclude:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            HTTP_LATENCY.labels(scope.get("method", ""), template, str(status)).observe(time.perf_counter() - start)
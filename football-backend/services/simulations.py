@@ -0,0 +1,207 @@
+"""Background season simulations in a dedicated process pool.
+
+A full-league projection runs tens of thousands of seasons, which is far
+too much CPU for a request handler. A request only registers a job. The
+work is split into chunks that run in SEASON_SIM_WORKERS processes, and
+clients poll the job for progress and, at the end, the result.
+
+- The chunks of one job use independent random streams
+  (`SeedSequence.spawn`), so their results can simply be summed. With a
+  seed, a run is reproducible.
+- At most SEASON_SIM_MAX_JOBS jobs run at once. Further submissions get
+  `SimulationsBusy` (503 from the routes), rather than queueing work nobody
+  may ever poll.
+- Finished jobs are kept for SEASON_SIM_RESULT_TTL seconds, then forgotten.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any
+
+import numpy as np
+
+from logic.match_simulator.season import simulate_batch, summarize
+
+logger = logging.getLogger("services.simulations")
+
+# Seasons per submitted chunk: large enough to amortize the IPC, small
+# enough that progress moves and work spreads over all workers.
+CHUNK_ITERATIONS = 2500
+
+
+class SimulationsBusy(Exception):
+    """Too many simulations are already running."""
+
+
+class SimulationJob:
+    def __init__(self, owner: str, league_id: str, league: dict, iterations: int, relegation_spots: int):
+        self.id = uuid.uuid4().hex
+        self.owner = owner
+        self.league_id = league_id
+        self.league = league
+        self.iterations = iterations
+        self.relegation_spots = relegation_spots
+        self.completed = 0
+        self.status = "queued"
+        self.result: list[dict[str, Any]] | None = None
+        self.error: str | None = None
+        self.created_at = time.time()
+        self.finished_at: float | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "jobId": self.id,
+            "leagueId": self.league_id,
+            "status": self.status,
+            "iterations": self.iterations,
+            "completed": self.completed,
+            "progress": round(self.completed / self.iterations, 4),
+            "fixturesRemaining": int(len(self.league["home"])),
+            "matchesPerTeam": self.league["matches_per_team"],
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class SeasonSimulator:
+    def __init__(self, workers: int | None = None, max_jobs: int | None = None, result_ttl: float | None = None):
+        self.workers = workers or int(os.getenv("SEASON_SIM_WORKERS", str(min(4, os.cpu_count() or 1))))
+        self.max_jobs = max_jobs or int(os.getenv("SEASON_SIM_MAX_JOBS", "4"))
+        self.result_ttl = result_ttl or float(os.getenv("SEASON_SIM_RESULT_TTL", "3600"))
+        self._executor: ProcessPoolExecutor | None = None
+        self._executor_lock = threading.Lock()
+        self._jobs: OrderedDict[str, SimulationJob] = OrderedDict()
+        self._tasks: set[asyncio.Task] = set()
+        self.running = 0
+        self.rejected = 0
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    # spawn, as for password hashing: the API process runs threads.
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                    )
+        return self._executor
+
+    def shutdown(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _expire(self) -> None:
+        cutoff = time.time() - self.result_ttl
+        for job_id, job in list(self._jobs.items()):
+            if job.finished_at is not None and job.finished_at < cutoff:
+                del self._jobs[job_id]
+
+    def submit(
+        self,
+        owner: str,
+        league_id: str,
+        league: dict,
+        iterations: int,
+        seed: int | None = None,
+        relegation_spots: int = 3,
+    ) -> SimulationJob:
+        self._expire()
+        if self.running >= self.max_jobs:
+            self.rejected += 1
+            raise SimulationsBusy()
+
+        job = SimulationJob(owner, league_id, league, iterations, relegation_spots)
+        self._jobs[job.id] = job
+        self.running += 1
+        task = asyncio.ensure_future(self._run(job, seed))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def get(self, job_id: str, owner: str) -> SimulationJob | None:
+        self._expire()
+        job = self._jobs.get(job_id)
+        if job is None or job.owner != owner:
+            return None
+        return job
+
+    async def _chunk(self, league: dict, iterations: int, seed):
+        loop = asyncio.get_running_loop()
+        pool = self._pool()
+        try:
+            return await loop.run_in_executor(pool, simulate_batch, league, iterations, seed)
+        except BrokenProcessPool:
+            logger.warning("Season simulation pool broke; restarting it")
+            with self._executor_lock:
+                if self._executor is pool:
+                    self._executor = None
+            return await loop.run_in_executor(self._pool(), simulate_batch, league, iterations, seed)
+
+    async def _run(self, job: SimulationJob, seed: int | None) -> None:
+        started = time.perf_counter()
+        job.status = "running"
+        sizes = [CHUNK_ITERATIONS] * (job.iterations // CHUNK_ITERATIONS)
+        if job.iterations % CHUNK_ITERATIONS:
+            sizes.append(job.iterations % CHUNK_ITERATIONS)
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+        n = len(job.league["teams"])
+        position_counts = np.zeros((n, n), dtype=np.int64)
+        points_sum = np.zeros(n)
+        try:
+            chunks = [
+                asyncio.ensure_future(self._chunk(job.league, size, chunk_seed))
+                for size, chunk_seed in zip(sizes, seeds)
+            ]
+            try:
+                for size, done in zip(sizes, chunks):
+                    counts, points = await done
+                    position_counts += counts
+                    points_sum += points
+                    job.completed += size
+            finally:
+                for chunk in chunks:
+                    chunk.cancel()
+
+            job.result = summarize(
+                job.league, position_counts, points_sum, job.iterations, job.relegation_spots
+            )
+            job.status = "done"
+        except asyncio.CancelledError:
+            job.status = "failed"
+            job.error = "cancelled"
+            raise
+        except Exception as e:
+            logger.warning("Season simulation %s failed: %s", job.id, e)
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            self.running -= 1
+            job.finished_at = time.time()
+            logger.info(
+                "Season simulation %s (%s, %d iterations) %s in %.1f s",
+                job.id, job.league_id, job.iterations, job.status, time.perf_counter() - started,
+            )
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "running": self.running,
+            "max_jobs": self.max_jobs,
+            "jobs": len(self._jobs),
+            "rejected": self.rejected,
+        }
+
+
+season_simulator = SeasonSimulator()
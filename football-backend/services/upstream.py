@@ -0,0 +1,127 @@
+"""Shared async HTTP client for third-party data (schedules, news, standings).
+
+One `httpx.AsyncClient` per process keeps TLS connections alive between
+calls. A per-host semaphore caps concurrent requests to each upstream, so a
+slow provider queues its own callers instead of exhausting the pool for
+everyone. Handlers await these calls, so no threadpool worker is held while
+waiting on the network.
+
+Base URLs come from the environment so the integrations can be pointed at a
+local stub server in tests.
+"""
+
+import asyncio
+import os
+import time
+from typing import Any
+
+import httpx
+
+from prometheus_client import Histogram
+
+from services.metrics import DEFAULT_BUCKETS
+
+USER_AGENT = "One-Football/1.0 (+https://localhost)"
+
+UPSTREAM_SECONDS = Histogram(
+    "upstream_request_duration_seconds",
+    "Third-party HTTP call duration (including the per-host queue wait)",
+    ("host", "outcome"),
+    buckets=DEFAULT_BUCKETS,
+)
+
+
+class UpstreamError(Exception):
+    """An upstream call failed; `detail` is safe to show to the user."""
+
+    def __init__(self, detail: str, status_code: int | None = None):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+
+class UpstreamClient:
+    def __init__(
+        self,
+        timeout: float = 8.0,
+        connect_timeout: float = 3.0,
+        max_connections: int = 50,
+        max_keepalive: int = 20,
+        per_host_limit: int = 8,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive)
+        self.per_host_limit = per_host_limit
+        # Tests pass an httpx.MockTransport; None uses the network.
+        self.transport = transport
+        self._client: httpx.AsyncClient | None = None
+        self._host_limits: dict[str, asyncio.Semaphore] = {}
+
+    async def start(self) -> None:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=self.limits,
+                headers={"User-Agent": USER_AGENT},
+                follow_redirects=True,
+                transport=self.transport,
+            )
+
+    async def aclose(self) -> None:
+        client, self._client = self._client, None
+        self._host_limits = {}
+        if client is not None:
+            await client.aclose()
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = httpx.URL(url).host
+        sem = self._host_limits.get(host)
+        if sem is None:
+            sem = self._host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+        return sem
+
+    async def get(self, url: str, *, headers: dict[str, str] | None = None, timeout: float | None = None) -> httpx.Response:
+        if self._client is None:
+            await self.start()
+
+        host = httpx.URL(url).host
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            async with self._host_limit(url):
+                resp = await self._client.get(
+                    url,
+                    headers=headers,
+                    timeout=httpx.Timeout(timeout, connect=self.timeout.connect) if timeout else httpx.USE_CLIENT_DEFAULT,
+                )
+            outcome = f"{resp.status_code // 100}xx"
+        except httpx.TimeoutException:
+            outcome = "timeout"
+            raise UpstreamError(f"timed out fetching {host}")
+        except httpx.HTTPError as e:
+            raise UpstreamError(str(e) or type(e).__name__)
+        finally:
+            UPSTREAM_SECONDS.labels(host, outcome).observe(time.perf_counter() - started)
+
+        if resp.status_code >= 400:
+            raise UpstreamError(resp.text or f"HTTP {resp.status_code}", status_code=resp.status_code)
+        return resp
+
+    async def get_json(self, url: str, **kwargs) -> Any:
+        resp = await self.get(url, headers={"Accept": "application/json", **(kwargs.pop("headers", None) or {})}, **kwargs)
+        try:
+            return resp.json()
+        except ValueError as e:
+            raise UpstreamError(f"invalid JSON from {httpx.URL(url).host}: {e}")
+
+    async def get_bytes(self, url: str, **kwargs) -> bytes:
+        resp = await self.get(url, **kwargs)
+        return resp.content
+
+
+upstream = UpstreamClient(
+    timeout=float(os.getenv("UPSTREAM_TIMEOUT", "8")),
+    max_connections=int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "50")),
+    per_host_limit=int(os.getenv("UPSTREAM_PER_HOST_LIMIT", "8")),
+)
@@ -0,0 +1,77 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse
+from sklearn.ensemble import RandomForestClassifier
+
+from logic.compiled_forest import CompiledForest
+from logic.model_registry import HISTORY_MODEL_DIR, STRENGTH_MODEL_DIR, load_artifact, resolve_model_dir
+
+
+def _published_forest(model_dir, filename):
+    _, path = resolve_model_dir(model_dir)
+    return load_artifact(os.path.join(path, filename))
+
+
+@pytest.fixture(scope="module")
+def strength_forest():
+    return _published_forest(STRENGTH_MODEL_DIR, "strength_model.pkl")
+
+
+@pytest.fixture(scope="module")
+def history_forest():
+    return _published_forest(HISTORY_MODEL_DIR, "history_model.pkl")
+
+
+def _sklearn(forest, X):
+    """X with the column names the forest was fitted with (if any)."""
+    names = getattr(forest, "feature_names_in_", None)
+    return X if names is None else pd.DataFrame(X, columns=names)
+
+
+def _presence_rows(n_features, n_rows=300, seed=0):
+    """Lineup-like 0/1 rows: mostly sparse, plus the all-zero row."""
+    rng = np.random.default_rng(seed)
+    X = (rng.random((n_rows, n_features)) < 0.1).astype(np.float32)
+    X[0] = 0
+    return X
+
+
+def test_strength_dense_matches_sklearn(strength_forest):
+    X = _presence_rows(strength_forest.n_features_in_)
+    compiled = CompiledForest(strength_forest)
+
+    np.testing.assert_array_equal(compiled.predict_proba(X), strength_forest.predict_proba(_sklearn(strength_forest, X)))
+    np.testing.assert_array_equal(compiled.predict(X), strength_forest.predict(_sklearn(strength_forest, X)))
+
+
+def test_strength_csr_matches_sklearn(strength_forest):
+    X = _presence_rows(strength_forest.n_features_in_, seed=1)
+    compiled = CompiledForest(strength_forest)
+
+    np.testing.assert_array_equal(
+        compiled.predict_proba(sparse.csr_matrix(X)), strength_forest.predict_proba(_sklearn(strength_forest, X))
+    )
+
+
+def test_history_matches_sklearn_on_every_pair(history_forest):
+    n_teams = 40
+    a, b = np.meshgrid(np.arange(n_teams), np.arange(n_teams), indexing="ij")
+    X = pd.DataFrame({"Team_A_enc": a.ravel(), "Team_B_enc": b.ravel()})
+    compiled = CompiledForest(history_forest)
+
+    np.testing.assert_array_equal(compiled.predict_proba(X.to_numpy()), history_forest.predict_proba(X))
+
+
+def test_fitted_forest_with_continuous_features():
+    rng = np.random.default_rng(2)
+    X = rng.normal(size=(400, 6))
+    y = (X[:, 0] + X[:, 1] ** 2 > 0.5).astype(int) + (X[:, 2] > 1)
+    forest = RandomForestClassifier(n_estimators=25, random_state=0).fit(X, y)
+    compiled = CompiledForest(forest)
+
+    X_test = rng.normal(size=(200, 6))
+    np.testing.assert_allclose(compiled.predict_proba(X_test), forest.predict_proba(X_test), rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(compiled.predict(X_test), forest.predict(X_test))
@@ -0,0 +1,74 @@
+import random
+
+import pytest
+
+from logic.lineup_optimizer.optimize import formation_roles, optimize_lineup
+from logic.model_registry import get_models
+
+POSITIONS = ["Goalkeeper"] * 3 + ["Defender"] * 8 + ["Midfielder"] * 8 + ["Forward"] * 6
+
+
+@pytest.fixture(scope="module")
+def models():
+    return get_models()
+
+
+def _squad(models, positions, seed=0):
+    names = random.Random(seed).sample(models.strength_features[:-1], len(positions))
+    return [
+        {"name": name, "position": position, "rating": 60 + (i * 7) % 30}
+        for i, (name, position) in enumerate(zip(names, positions))
+    ]
+
+
+def _players(result):
+    return frozenset(p["name"] for p in result["lineup"])
+
+
+def test_results_are_distinct_xis_best_first(models):
+    results = optimize_lineup(models, _squad(models, [None] * 25), "4-4-2", top_k=5)
+
+    assert len(results) == 5
+    assert len({_players(r) for r in results}) == 5
+    assert all(len(_players(r)) == 11 for r in results)
+    scores = [r["score"] for r in results]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_roles_follow_formation_and_positions(models):
+    squad = _squad(models, POSITIONS)
+    position_of = {p["name"]: p["position"] for p in squad}
+
+    for formation in ("4-3-3", "4-2-3-1", "3-5-2"):
+        for result in optimize_lineup(models, squad, formation, top_k=3):
+            roles = [p["role"] for p in result["lineup"]]
+            assert {role: roles.count(role) for role in set(roles)} == formation_roles(formation)
+            # Enough natural players for every group: nobody plays out of position.
+            assert all(position_of[p["name"]] == p["role"] for p in result["lineup"])
+
+
+def test_out_of_position_players_fill_short_groups(models):
+    positions = ["Defender"] * 6 + ["Midfielder"] * 4 + ["Forward"] * 3
+    results = optimize_lineup(models, _squad(models, positions), "4-3-3", top_k=1)
+
+    goalkeeper = next(p for p in results[0]["lineup"] if p["role"] == "Goalkeeper")
+    assert goalkeeper["position"] != "Goalkeeper"
+    # Out of position in goal counts at half the rating.
+    squad_rating = {p["name"]: p["rating"] for p in _squad(models, positions)}
+    assert goalkeeper["rating"] == pytest.approx(squad_rating[goalkeeper["name"]] * 0.5)
+
+
+def test_fewer_than_eleven_players_is_an_error(models):
+    squad = _squad(models, POSITIONS)[:10]
+    with pytest.raises(ValueError, match="at least 11"):
+        optimize_lineup(models, squad, "4-3-3")
+
+    duplicated = squad + [dict(squad[0])]
+    with pytest.raises(ValueError, match="at least 11"):
+        optimize_lineup(models, duplicated, "4-3-3")
+
+
+@pytest.mark.parametrize("formation", ["", "4-4", "4-4-3", "a-b-c", "5-0-5"])
+def test_invalid_formation_is_an_error(models, formation):
+    with pytest.raises(ValueError, match="Invalid formation"):
+        optimize_lineup(models, _squad(models, POSITIONS), formation)
@@ -0,0 +1,66 @@
+import random
+
+from chat.matcher import AhoCorasick, IntentMatcher
+
+# A tiny alphabet makes overlapping and nested keywords common.
+ALPHABET = "ab c"
+
+
+def _word(rng, max_len):
+    return "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, max_len)))
+
+
+def _naive_match(intents, text):
+    """Reference for IntentMatcher.match with plain `in` checks."""
+    ranked = []
+    index = 0
+    for intent in intents:
+        words = intent.get("any") or intent.get("all")
+        words = list(dict.fromkeys(w.lower() for w in words))
+        found = [w for w in words if w in text]
+        if intent.get("any"):
+            if found:
+                ranked.append((index, max(len(w) for w in found)))
+        elif len(found) == len(words):
+            ranked.append((index, sum(len(w) for w in words)))
+        index += 1
+    ranked.sort(key=lambda item: (-item[1], item[0]))
+    return ranked
+
+
+def test_aho_corasick_finds_the_same_patterns_as_in():
+    rng = random.Random(0)
+    for _ in range(300):
+        patterns = [_word(rng, 4) for _ in range(rng.randint(1, 12))]
+        automaton = AhoCorasick(patterns)
+        for _ in range(10):
+            text = _word(rng, 30)
+            expected = {i for i, p in enumerate(patterns) if p and p in text}
+            assert automaton.find(text) == expected, (patterns, text)
+
+
+def test_intent_matcher_agrees_with_naive_rules():
+    rng = random.Random(1)
+    for _ in range(200):
+        intents = []
+        for n in range(rng.randint(1, 8)):
+            mode = rng.choice(("any", "all"))
+            intents.append({mode: [_word(rng, 3) or "a" for _ in range(rng.randint(1, 3))], "reply": f"reply {n}"})
+        matcher = IntentMatcher(intents)
+        for _ in range(10):
+            text = _word(rng, 20)
+            assert matcher.match(text) == _naive_match(intents, text), (intents, text)
+
+
+def test_most_specific_intent_wins():
+    matcher = IntentMatcher(
+        [
+            {"any": ["formation"], "reply": "generic"},
+            {"all": ["formation", "counter"], "reply": "counter formations"},
+            {"any": [], "reply": "never"},
+            {"any": ["press"], "reply": "   "},
+        ]
+    )
+    assert matcher.best_reply("which formation suits a counter attack") == "counter formations"
+    assert matcher.best_reply("best formation?") == "generic"
+    assert matcher.best_reply("how do i press") is None
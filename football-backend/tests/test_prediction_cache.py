@@ -0,0 +1,105 @@
+from types import SimpleNamespace
+
+import pytest
+
+from logic.combined_predictor import cache
+from logic.combined_predictor.cache import PredictionCache, canonical_key
+
+XI = {"GK": "David Raya", "CB1": "William Saliba", "ST": "Kai Havertz"}
+
+
+def _key(left=XI, right=None, **overrides):
+    args = {
+        "team_a": "Arsenal",
+        "team_b": "Chelsea",
+        "left_formation": "4-3-3",
+        "right_formation": "4-4-2",
+        "left_playing_11": left,
+        "right_playing_11": right or {},
+        "left_rating": 80,
+        "right_rating": 78,
+        "model_version": "v1",
+    }
+    args.update(overrides)
+    return canonical_key(**args)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    return clock
+
+
+def test_key_ignores_slot_order_and_formatting():
+    assert _key(XI) == _key(dict(reversed(list(XI.items()))))
+    assert _key(left_formation=" 4-3-3 ") == _key()
+    assert _key(left_rating="80") == _key(left_rating=80.0)
+
+
+def test_key_depends_on_player_names():
+    assert _key({**XI, "ST": "Gabriel Jesus"}) != _key()
+    assert _key({**XI, "LW": "Bukayo Saka"}) != _key()
+    assert _key(model_version="v2") != _key()
+
+
+def test_key_treats_numeric_presence_values_alike():
+    assert _key({"Saka": 1}) == _key({"Saka": "1"}) == _key({"Saka": 1.0})
+    # Zero means "not selected", same as absent.
+    assert _key({"Saka": 1, "Rice": 0}) == _key({"Saka": 1})
+
+
+def test_entries_expire_after_ttl(clock):
+    c = PredictionCache(maxsize=10, ttl=5)
+    c.put("k", "v")
+    clock.now += 4.9
+    assert c.get("k") == (True, "v")
+    clock.now += 0.2
+    assert c.get("k") == (False, None)
+    assert c.stats()["size"] == 0
+    assert (c.hits, c.misses) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    c = PredictionCache(maxsize=2, ttl=60)
+    c.put("a", 1)
+    c.put("b", 2)
+    assert c.get("a") == (True, 1)
+    c.put("c", 3)
+
+    assert c.get("b") == (False, None)
+    assert c.get("a") == (True, 1)
+    assert c.get("c") == (True, 3)
+    assert c.evictions == 1
+
+
+def test_cached_predictions_hit_and_bypass(monkeypatch):
+    calls = []
+
+    def fake_combine(*args, with_probabilities):
+        calls.append(args)
+        return "Arsenal", {"Win_A": 0.5, "Draw": 0.3, "Win_B": 0.2}
+
+    monkeypatch.setattr(cache, "combine_predictions", fake_combine)
+    monkeypatch.setattr(cache, "get_models", lambda: SimpleNamespace(version="test"))
+    monkeypatch.setattr(cache, "prediction_cache", PredictionCache(maxsize=10, ttl=60))
+
+    args = ("Arsenal", "Chelsea", "4-3-3", "4-4-2", XI, {}, 80, 78)
+    first = cache.cached_combine_predictions(*args)
+    second = cache.cached_combine_predictions(*args[:4], dict(reversed(list(XI.items()))), *args[5:])
+    assert first == second
+    assert len(calls) == 1
+
+    # A non-string formation cannot be keyed: the predictor is called directly.
+    cache.cached_combine_predictions("Arsenal", "Chelsea", None, "4-4-2", XI, {}, 80, 78)
+    assert len(calls) == 2
+    stats = cache.prediction_cache.stats()
+    assert (stats["hits"], stats["misses"], stats["bypasses"]) == (1, 1, 1)
@@ -0,0 +1,84 @@
+import asyncio
+
+import httpx
+import pytest
+
+from services.upstream import UpstreamClient, UpstreamError
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def _with_client(handler, fn, **kwargs):
+    client = UpstreamClient(transport=httpx.MockTransport(handler), **kwargs)
+    try:
+        return await fn(client)
+    finally:
+        await client.aclose()
+
+
+def test_per_host_limit_caps_concurrency_per_host():
+    in_flight: dict[str, int] = {}
+    peak: dict[str, int] = {}
+    peak_total = 0
+
+    async def handler(request):
+        nonlocal peak_total
+        host = request.url.host
+        in_flight[host] = in_flight.get(host, 0) + 1
+        peak[host] = max(peak.get(host, 0), in_flight[host])
+        peak_total = max(peak_total, sum(in_flight.values()))
+        await asyncio.sleep(0.01)
+        in_flight[host] -= 1
+        return httpx.Response(200, json={"host": host})
+
+    async def fetch_all(client):
+        urls = [f"https://{host}.example/{i}" for host in ("a", "b") for i in range(6)]
+        return await asyncio.gather(*(client.get_json(url) for url in urls))
+
+    results = run(_with_client(handler, fetch_all, per_host_limit=2))
+
+    assert [r["host"] for r in results] == ["a.example"] * 6 + ["b.example"] * 6
+    assert peak == {"a.example": 2, "b.example": 2}
+    # A busy host does not hold back the other one.
+    assert peak_total == 4
+
+
+def test_timeout_maps_to_upstream_error():
+    def handler(request):
+        raise httpx.ReadTimeout("read timed out", request=request)
+
+    with pytest.raises(UpstreamError) as exc:
+        run(_with_client(handler, lambda c: c.get("https://slow.example/feed")))
+    assert exc.value.detail == "timed out fetching slow.example"
+    assert exc.value.status_code is None
+
+
+def test_transport_error_maps_to_upstream_error():
+    def handler(request):
+        raise httpx.ConnectError("connection refused", request=request)
+
+    with pytest.raises(UpstreamError) as exc:
+        run(_with_client(handler, lambda c: c.get("https://down.example/feed")))
+    assert exc.value.detail == "connection refused"
+    assert exc.value.status_code is None
+
+
+def test_error_status_maps_to_upstream_error():
+    def handler(request):
+        return httpx.Response(503, text="maintenance")
+
+    with pytest.raises(UpstreamError) as exc:
+        run(_with_client(handler, lambda c: c.get("https://api.example/standings")))
+    assert exc.value.detail == "maintenance"
+    assert exc.value.status_code == 503
+
+
+def test_invalid_json_maps_to_upstream_error():
+    def handler(request):
+        return httpx.Response(200, text="<html>")
+
+    with pytest.raises(UpstreamError) as exc:
+        run(_with_client(handler, lambda c: c.get_json("https://api.example/standings")))
+    assert exc.value.detail.startswith("invalid JSON from api.example")